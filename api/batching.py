@@ -0,0 +1,77 @@
+"""Micro-batching for stateless model calls.
+
+Concurrent /chat requests that arrive within `window` seconds of each other are sent
+upstream together through `model.abatch`, at most `max_batch_size` at a time, and each
+caller gets back its own result (or its own exception).
+"""
+
+import asyncio
+
+
+class MicroBatcher:
+    def __init__(self, model, *, max_batch_size: int = 16, window: float = 0.01, max_batches_in_flight: int = 8):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self._batch_slots = asyncio.Semaphore(max_batches_in_flight)
+        self._pending: list[tuple[object, asyncio.Future]] = []
+        self._full = asyncio.Event()
+        self._collector = None  # the task currently holding a batch open
+        self.stats = {"requests": 0, "batches": 0, "max_batch": 0, "full_batches": 0}
+
+    async def submit(self, prompt):
+        """Queue `prompt` for the next batch and wait for its own result."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((prompt, future))
+        self.stats["requests"] += 1
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        if self._collector is None:
+            self._collector = asyncio.create_task(self._collect())
+        return await future
+
+    async def _collect(self):
+        # ~ Hold the batch open for `window`, or until it is full
+        try:
+            await asyncio.wait_for(self._full.wait(), timeout=self.window)
+        except asyncio.TimeoutError:
+            pass
+        batch, self._pending = self._pending[: self.max_batch_size], self._pending[self.max_batch_size :]
+        self._full.clear()
+        # ^ Whatever didn't fit starts the next batch straight away
+        self._collector = asyncio.create_task(self._collect()) if self._pending else None
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        await self._dispatch(batch)
+
+    async def _dispatch(self, batch: list) -> None:
+        async with self._batch_slots:
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            if len(batch) == self.max_batch_size:
+                self.stats["full_batches"] += 1
+            try:
+                results = await self.model.abatch(
+                    [prompt for prompt, _ in batch],
+                    config={"max_concurrency": self.max_batch_size},
+                    return_exceptions=True,
+                )
+            except Exception as e:  # the batch call itself failed, not a single item
+                results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():  # the caller went away
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def snapshot(self) -> dict:
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "avg_batch": round(self.stats["requests"] / batches, 2) if batches else 0.0,
+            "waiting": len(self._pending),
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.window * 1000,
+        }
@@ -53,10 +53,13 @@ app.add_middleware(
 )
 
 # Model setup
+# Built once: the model keeps one pooled HTTP client, so requests reuse warm connections.
+# Per-request streaming callbacks are passed in the call's config instead of a new model.
 model = init_chat_model(
     model="gpt-4o-mini",
     model_provider="openai",
-    api_key=os.getenv("OPENAI_API_KEY")
+    api_key=os.getenv("OPENAI_API_KEY"),
+    streaming=True,
 )
 
 class ChatRequest(BaseModel):
@@ -86,17 +89,10 @@ async def chat_stream(request_data: ChatRequest):
 
     queue = asyncio.Queue()
     handler = StreamHandler(queue)
-    streaming_model = init_chat_model(
-        model="gpt-4o-mini",
-        model_provider="openai",
-        api_key=os.getenv("OPENAI_API_KEY"),
-        streaming=True,
-        callbacks=[handler],
-    )
 
     async def event_generator():
         await asyncio.sleep(0.1)
-        asyncio.create_task(streaming_model.ainvoke(temp))
+        asyncio.create_task(model.ainvoke(temp, config={"callbacks": [handler]}))
         while True:
             token = await queue.get()
             if token is None:
@@ -56,9 +56,11 @@ graph_builder.add_edge(
 # * 6. Compile the graph
 graph = graph_builder.compile()
 
-initial = HumanMessage(content="What is your name?")
-state = {"messages": [initial]}
-
-output = graph.invoke(state)
-# print(output["messages"][-1].content)
-print(output["messages"][-1].content)
+# ~ Only call the LLM when run as a script, never on import
+if __name__ == "__main__":
+    initial = HumanMessage(content="What is your name?")
+    state = {"messages": [initial]}
+
+    output = graph.invoke(state)
+    # print(output["messages"][-1].content)
+    print(output["messages"][-1].content)
@@ -1,12 +1,14 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from langchain.chat_models import init_chat_model
+from contextlib import asynccontextmanager
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.callbacks.base import BaseCallbackHandler
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from dotenv import load_dotenv
 from pydantic import BaseModel
-import os, getpass, asyncio
+import os, getpass, asyncio, time
+
+from batching import MicroBatcher
 
 """
 - Memory
@@ -15,7 +17,38 @@ import os, getpass, asyncio
 
 load_dotenv()
 
-app = FastAPI()
+model = None  # created at startup, not import, so importing this module stays cheap
+batcher = None  # COALESCE=1: concurrent /chat calls share upstream batches
+startup_phases = {}  # phase -> ms
+
+
+def build_model():
+    global model
+    if model is None:
+        started = time.perf_counter()
+        from langchain.chat_models import init_chat_model
+
+        model = init_chat_model(model="gpt-4o-mini", model_provider="openai")
+        startup_phases["model"] = round((time.perf_counter() - started) * 1000, 1)
+    return model
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global batcher
+    build_model()
+    if os.getenv("COALESCE") == "1":
+        batcher = MicroBatcher(
+            model,
+            max_batch_size=int(os.getenv("COALESCE_MAX_BATCH", "16")),
+            window=float(os.getenv("COALESCE_WINDOW_MS", "10")) / 1000,
+            max_batches_in_flight=int(os.getenv("COALESCE_MAX_BATCHES", "8")),
+        )
+    print("Startup phases (ms):", startup_phases)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 if not os.environ.get("OPENAI_API_KEY"):
     # os.environ["OPENAI_API_KEY"] = getpass.getpass("Enter your OPENAI API KEY: ") # Won't work in prod
@@ -32,33 +65,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-model = init_chat_model(model="gpt-4o-mini", model_provider="openai")
+# ~ PRELOAD_GRAPH=1 builds the model at import, for `gunicorn --preload` (shared by the forked workers)
+if os.getenv("PRELOAD_GRAPH") == "1":
+    build_model()
 
 class ChatRequest(BaseModel):
     message: str
 
 
+# ~ Compiled once at import; each request only fills in its message
+chat_template = ChatPromptTemplate(
+    [
+        ("system", "You are a helpful AI assistant. Answer the questions asked. Be as precise, clear and professional as possible."),
+        ("human", "{user_input}")
+    ]
+)
+
+
 @app.get("/")
 async def get_root():
     return {"message": "Langchain FastAPI server running"}
 
 
+@app.get("/batch/stats")
+async def get_batch_stats():
+    if batcher is None:
+        return {"success": True, "enabled": False}
+    return {"success": True, "enabled": True, **batcher.snapshot()}
+
+
 @app.post("/chat")
 # async def chat_endpoint(request: Request):
 async def chat_endpoint(request_data: ChatRequest):
-    """Create chat template with user input"""
+    """Fill the chat template with user input"""
     # data = await request.json()
     # user_input = data.get("message")
-    chat_template = ChatPromptTemplate(
-        [
-            ("system", "You are a helpful AI assistant. Answer the questions asked. Be as precise, clear and professional as possible."),
-            ("human", "{user_input}")
-        ]
-    )
-    
     temp = chat_template.invoke({"user_input": request_data.message})
     
-    result = model.invoke(temp)
+    if batcher is not None:
+        result = await batcher.submit(temp)
+    else:
+        result = await model.ainvoke(temp)  # don't block the event loop on the LLM round trip
     return {"success": True, "message": result.content}
 
     #* MEMORY 
\ No newline at end of file
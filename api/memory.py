@@ -8,8 +8,10 @@ from langchain.chat_models import init_chat_model
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain.prompts import ChatPromptTemplate
 from langchain_tavily import TavilySearch
-import json
+import json, time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from langchain_core.messages import ToolMessage
+from tool_output import ToolOutputStore, approx_tokens, reduce_search_results, prompt_tokens_saved
 from langgraph.checkpoint.memory import InMemorySaver
 
 memory = (
@@ -69,32 +71,97 @@ def chatbot(state: State):
 
 
 class BasicToolNode:
-    """A node that runs the tools requested in the last AIMessage."""
+    """A node that runs the tools requested in the last AIMessage.
 
-    def __init__(self, tools: list) -> None:
+    The tool calls are independent, so they run at the same time on a small thread pool
+    (two Tavily searches cost one search of latency, not two). Each call gets its own timeout
+    (`timeouts` overrides the default per tool name), and the ToolMessages come back in the
+    same order as `message.tool_calls`.
+
+    `reducers` maps a tool name to a function that turns its raw result into the (shorter)
+    text the model sees; the raw result is then kept in `store` and the ToolMessage only
+    carries `{"ref", "tokens_saved"}` in its artifact. Tools without a reducer are stored
+    as `json.dumps(result)`, as before.
+    """
+
+    def __init__(
+        self,
+        tools: list,
+        max_workers: int = 4,
+        timeout: float = 30,
+        timeouts: dict = None,
+        reducers: dict = None,
+        store: ToolOutputStore = None,
+    ) -> None:
         self.tools_by_name = {tool.name: tool for tool in tools}
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.reducers = reducers or {}
+        self.store = store or ToolOutputStore()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tool"
+        )
 
     def __call__(self, inputs: dict):
         if messages := inputs.get("messages", []):
             message = messages[-1]
         else:
             raise ValueError("No message found in input")
-        outputs = []
+
+        # ~ Fire every tool call first...
+        pending = []
         for tool_call in message.tool_calls:
-            tool_result = self.tools_by_name[tool_call["name"]].invoke(
-                tool_call["args"]
+            timeout = self.timeouts.get(tool_call["name"], self.timeout)
+            future = self.executor.submit(
+                self.tools_by_name[tool_call["name"]].invoke, tool_call["args"]
             )
-            outputs.append(
-                ToolMessage(
-                    content=json.dumps(tool_result),
-                    name=tool_call["name"],
-                    tool_call_id=tool_call["id"],
+            pending.append((tool_call, future, time.monotonic() + timeout, timeout))
+
+        # ~ ...then collect them in the order the model asked for them
+        outputs = []
+        for tool_call, future, deadline, timeout in pending:
+            try:
+                tool_result = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                future.cancel()  # only helps if it hasn't started yet; a running call is abandoned
+                outputs.append(
+                    ToolMessage(
+                        content=json.dumps(
+                            {"error": f"{tool_call['name']} timed out after {timeout}s"}
+                        ),
+                        name=tool_call["name"],
+                        tool_call_id=tool_call["id"],
+                        status="error",
+                    )
                 )
-            )
+                continue
+            outputs.append(self.tool_message(tool_call, tool_result))
         return {"messages": outputs}
 
-
-tool_node = BasicToolNode(tools=[tool])
+    def tool_message(self, tool_call: dict, tool_result) -> ToolMessage:
+        raw = json.dumps(tool_result)
+        reducer = self.reducers.get(tool_call["name"])
+        if reducer is None:
+            return ToolMessage(content=raw, name=tool_call["name"], tool_call_id=tool_call["id"])
+
+        content = reducer(tool_result)
+        return ToolMessage(
+            content=content,
+            name=tool_call["name"],
+            tool_call_id=tool_call["id"],
+            # ^ never sent to the model; the full payload stays retrievable via store.get(ref)
+            artifact={
+                "ref": self.store.put(raw),
+                "tokens_saved": max(0, approx_tokens(raw) - approx_tokens(content)),
+            },
+        )
+
+
+# ~ Raw Tavily responses live here, not in the thread state
+tool_outputs = ToolOutputStore()
+tool_node = BasicToolNode(
+    tools=[tool], reducers={tool.name: reduce_search_results}, store=tool_outputs
+)
 graph_builder.add_node("tools", tool_node)
 
 
@@ -161,25 +228,31 @@ output["messages"][-1].pretty_print()"""
 
 # The config is the **second positional argument** to stream() or invoke()!
 
-# first user message
-events = graph.stream(
-    {"messages": [{"role": "user", "content": user_input}]},
-    config,
-    stream_mode="values",
-)
-
-for event in events:
-    event["messages"][-1].pretty_print()
-
-# Second user message
-events = graph.stream(
-    {"messages": [{"role": "user", "content": user_input2}]},
-    config,
-    stream_mode="values",
-)
-
-for event in events:
-    event["messages"][-1].pretty_print()
+# ~ Only call the LLM when run as a script, never on import
+if __name__ == "__main__":
+    # first user message
+    events = graph.stream(
+        {"messages": [{"role": "user", "content": user_input}]},
+        config,
+        stream_mode="values",
+    )
+
+    for event in events:
+        event["messages"][-1].pretty_print()
+    saved = prompt_tokens_saved(graph.get_state(config).values["messages"])
+    print(f"Reduced tool outputs save ~{saved} prompt tokens per model call")
+
+    # Second user message
+    events = graph.stream(
+        {"messages": [{"role": "user", "content": user_input2}]},
+        config,
+        stream_mode="values",
+    )
+
+    for event in events:
+        event["messages"][-1].pretty_print()
+    saved = prompt_tokens_saved(graph.get_state(config).values["messages"])
+    print(f"Reduced tool outputs save ~{saved} prompt tokens per model call")
 
 
 """initial = HumanMessage(
@@ -0,0 +1,125 @@
+"""Shrinks tool results before they become ToolMessages.
+
+A raw TavilySearch response (answer, follow-up questions, images, per-result content
+and scores, timings) is kept in the thread state as a ToolMessage and re-sent to the
+model on every later turn. `reduce_search_results` keeps only what the model uses:
+deduplicated results, best score first, with the sentences that match the query,
+within a character budget. The full payload goes to a `ToolOutputStore` and the
+ToolMessage only carries its reference (in `artifact`, which is never sent to the model).
+"""
+
+import json
+import re
+import uuid
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+
+def approx_tokens(text: str) -> int:
+    return len(text) // 4 + 1  # ~4 characters per token for English
+
+
+class ToolOutputStore:
+    """Full tool payloads by reference, outside the thread state. Least recently used go first."""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, str] = OrderedDict()
+
+    def put(self, payload: str) -> str:
+        ref = uuid.uuid4().hex
+        self._entries[ref] = payload
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return ref
+
+    def get(self, ref: str) -> Optional[str]:
+        payload = self._entries.get(ref)
+        if payload is not None:
+            self._entries.move_to_end(ref)
+        return payload
+
+
+def _normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    query = "&".join(p for p in parts.query.split("&") if p and not p.startswith("utm_"))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower().removeprefix("www."), parts.path.rstrip("/"), query, ""))
+
+
+def _sentences(text: str) -> list[str]:
+    return [s.strip() for s in re.split(r"(?<=[.!?])\s+", re.sub(r"\s+", " ", text)) if s.strip()]
+
+
+def _words(text: str) -> set[str]:
+    return {w for w in re.findall(r"[a-z0-9]+", text.lower()) if len(w) > 2}
+
+
+def _snippet(content: str, query_words: set, budget: int, seen: set) -> str:
+    """The sentences of `content` that share the most words with the query, in their original order.
+
+    Sentences already in `seen` (from this result or an earlier one) are skipped.
+    """
+    sentences = []
+    for sentence in _sentences(content):
+        key = " ".join(re.findall(r"\w+", sentence.lower()))
+        if key not in seen:
+            seen.add(key)
+            sentences.append(sentence)
+    ranked = sorted(range(len(sentences)), key=lambda i: (-len(_words(sentences[i]) & query_words), i))
+    chosen, used = [], 0
+    for i in ranked:
+        if used + len(sentences[i]) > budget:
+            if not chosen:  # always keep something, cut to fit
+                chosen.append(i)
+                used = budget
+            continue
+        chosen.append(i)
+        used += len(sentences[i]) + 1
+    return " ".join(sentences[i] for i in sorted(chosen))[:budget]
+
+
+def reduce_search_results(result, budget_chars: int = 1200) -> str:
+    """A TavilySearch response as compact text: answer, then `[n] title (url): snippet` lines."""
+    if not isinstance(result, dict) or "results" not in result:
+        return json.dumps(result)
+
+    query_words = _words(result.get("query") or "")
+    lines = []
+    if result.get("answer"):
+        lines.append(f"Answer: {result['answer']}")
+
+    # ~ Drop results that point at the same page or repeat the same text
+    seen_urls, seen_content, results = set(), set(), []
+    for item in sorted(result["results"], key=lambda r: -(r.get("score") or 0)):
+        url = _normalize_url(item.get("url", ""))
+        content_key = re.sub(r"\W+", " ", (item.get("content") or "").lower()).strip()[:200]
+        if url in seen_urls or (content_key and content_key in seen_content):
+            continue
+        seen_urls.add(url)
+        seen_content.add(content_key)
+        results.append(item)
+
+    remaining = budget_chars - sum(len(line) for line in lines)
+    seen_sentences, cited = set(), 0
+    for n, item in enumerate(results):
+        header = f"[{cited + 1}] {item.get('title', '').strip()} ({item.get('url', '')}): "
+        per_result = remaining // (len(results) - n) - len(header)
+        if per_result <= 40:
+            break
+        snippet = _snippet(item.get("content") or "", query_words, per_result, seen_sentences)
+        if not snippet:
+            continue
+        cited += 1
+        lines.append(header + snippet)
+        remaining -= len(lines[-1])
+    return "\n".join(lines)
+
+
+def prompt_tokens_saved(messages: list) -> int:
+    """How many prompt tokens the reduced tool outputs in `messages` save on each model call."""
+    return sum(
+        (m.artifact or {}).get("tokens_saved", 0)
+        for m in messages
+        if m.type == "tool" and isinstance(getattr(m, "artifact", None), dict)
+    )
@@ -1,24 +1,24 @@
+import time
+
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager, contextmanager
 from dotenv import load_dotenv
-import os, io
+import os, uuid
 from pydantic import BaseModel
-from typing import Annotated, TypedDict
-from PIL import Image
+from typing import Annotated, Optional, TypedDict
 
 # Langchain and Langgraph imports
+# ^ The heavy ones (chat model, langchain_community tools, prebuilt nodes) are imported in build_graph()
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode, tools_condition
 
-from langchain.chat_models import init_chat_model
-from langchain_core.messages import ToolMessage
-from langchain_community.utilities import WikipediaAPIWrapper
-from langchain_community.tools import WikipediaQueryRun
+from langchain_core.messages import SystemMessage, ToolMessage
 
 # from langchain_groq import ChatGroq
-from langchain_experimental.utilities import PythonREPL
 from langchain_core.tools import Tool
 from langgraph.checkpoint.memory import InMemorySaver
 
@@ -34,7 +34,28 @@ memory = (
 
 
 load_dotenv()
-app = FastAPI()
+
+# ~ Built by build_graph() at startup (or at import with PRELOAD_GRAPH=1, for `gunicorn --preload`)
+llm_with_tools = None
+graph = None
+startup_phases = {}  # phase -> ms
+
+
+@contextmanager
+def startup_phase(name: str):
+    started = time.perf_counter()
+    yield
+    startup_phases[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    build_graph()  # no-op when it was preloaded
+    print("Startup phases (ms):", startup_phases)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 api_key = os.getenv("OPENAI_API_KEY")
 
@@ -45,6 +66,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Session-Id"],
 )
 
 
@@ -54,35 +76,8 @@ app.add_middleware(
 #########################################
 class ChatRequest(BaseModel):
     message: str
-    # session_id: str
-
+    session_id: Optional[str] = None  # one graph thread per session
 
-######################################
-# * Define tools
-#######################################
-
-# Wikipedia tool
-wiki_tool = WikipediaQueryRun(
-    api_wrapper=WikipediaAPIWrapper(top_k_results=1, doc_content_chars_max=200)
-)
-
-# python repl tool
-python_repl = PythonREPL()
-repl_tool = Tool(
-    name="python_repl",
-    description="Execute python code using this shell. Use print(...) to display results",
-    func=python_repl.run,
-)
-
-tools = [wiki_tool, repl_tool]
-
-################################
-# * Initialize chat model
-################################
-model = init_chat_model(model="gpt-4o-mini", model_provider="openai")
-
-# Add tools to the model
-llm_with_tools = model.bind_tools(tools)
 
 ##############################
 # * Create a State Graph
@@ -94,40 +89,99 @@ class State(TypedDict):
     messages: Annotated[list, add_messages]
 
 
-#############################
-# * Build Langgraph workflow
-#############################
-graph_builder = StateGraph(State)
+# ~System message
+# ^ Put in front of the messages at model-call time only, never stored in the thread state,
+# ^ and built once so the prompt prefix is byte-identical on every call (provider prompt caching)
+system_message = """
+    You are a helpful AI assistant.
+    - Use Wikipedia to answer factual questions.
+    - Use the Python REPL to execute computations and run short code snippets.
+    - Detect which tool (Wikipedia or python_repl) is needed and call it when appropriate.
+    - Prefer concise, professional answers; avoid unnecessary exposition.
+        """.strip()
+system_prompt = SystemMessage(content=system_message)
 
 
 def chatbot(state: State):
-    msgs = state["messages"]
+    # ^ Older threads still hold a system message per turn; skip those copies
+    msgs = [system_prompt] + [m for m in state["messages"] if m.type != "system"]
     response = llm_with_tools.invoke(msgs)
     return {"messages": [response]}
 
 
-################################
-# * Add tools to the graph
-################################
-graph_builder.add_node("tools", ToolNode(tools=[wiki_tool, repl_tool]))
+def build_graph():
+    """Build the tools, the model and the compiled graph, once per process."""
+    global llm_with_tools, graph
+    if graph is not None:
+        return graph
 
-###############################
-# * Add graph edges
-###############################
-graph_builder.add_edge(START, "chatbot")
-graph_builder.add_edge("tools", "chatbot")
-graph_builder.add_node("chatbot", chatbot)
-graph_builder.add_conditional_edges("chatbot", tools_condition)
-graph_builder.add_edge("chatbot", END)
+    ######################################
+    # * Define tools
+    #######################################
+    with startup_phase("tools"):
+        from langchain_community.utilities import WikipediaAPIWrapper
+        from langchain_community.tools import WikipediaQueryRun
+        from langchain_experimental.utilities import PythonREPL
 
-###################################
-# * Compile the graph
-###################################
-graph = graph_builder.compile(checkpointer=memory)
-# except Exception as e:
-#     print("An error occured: ", e)
+        # Wikipedia tool
+        wiki_tool = WikipediaQueryRun(
+            api_wrapper=WikipediaAPIWrapper(top_k_results=1, doc_content_chars_max=200)
+        )
+
+        # python repl tool
+        python_repl = PythonREPL()
+        repl_tool = Tool(
+            name="python_repl",
+            description="Execute python code using this shell. Use print(...) to display results",
+            func=python_repl.run,
+        )
+
+        tools = [wiki_tool, repl_tool]
+
+    ################################
+    # * Initialize chat model
+    ################################
+    with startup_phase("model"):
+        from langchain.chat_models import init_chat_model
+
+        model = init_chat_model(model="gpt-4o-mini", model_provider="openai")
+
+        # Add tools to the model
+        llm_with_tools = model.bind_tools(tools)
+
+    #############################
+    # * Build Langgraph workflow
+    #############################
+    with startup_phase("compile"):
+        from langgraph.prebuilt import ToolNode, tools_condition
+
+        graph_builder = StateGraph(State)
+
+        ################################
+        # * Add tools to the graph
+        ################################
+        graph_builder.add_node("tools", ToolNode(tools=[wiki_tool, repl_tool]))
+
+        ###############################
+        # * Add graph edges
+        ###############################
+        graph_builder.add_edge(START, "chatbot")
+        graph_builder.add_edge("tools", "chatbot")
+        graph_builder.add_node("chatbot", chatbot)
+        graph_builder.add_conditional_edges("chatbot", tools_condition)
+        graph_builder.add_edge("chatbot", END)
+
+        ###################################
+        # * Compile the graph
+        ###################################
+        graph = graph_builder.compile(checkpointer=memory)
+    return graph
 
-config = {"configurable": {"thread_id": "1"}}
+
+startup_phases["imports"] = round((time.perf_counter() - _import_started) * 1000, 1)
+
+if os.getenv("PRELOAD_GRAPH") == "1":
+    build_graph()
 
 
 # * /
@@ -136,6 +190,12 @@ async def home():
     return {"success": True, "message": "Welcome Home!"}
 
 
+# * /startup
+@app.get("/startup")
+async def startup():
+    return {"success": True, "phases_ms": startup_phases}
+
+
 ###################################
 # * chat route
 ###################################
@@ -143,18 +203,11 @@ async def home():
 async def chat_endpoint(request: ChatRequest):
     try:
         question = request.message
-
-        # ~System message
-        system_message = """
-    You are a helpful AI assistant.
-    - Use Wikipedia to answer factual questions.
-    - Use the Python REPL to execute computations and run short code snippets.
-    - Detect which tool (Wikipedia or python_repl) is needed and call it when appropriate.
-    - Prefer concise, professional answers; avoid unnecessary exposition.
-        """.strip()
+        session_id = request.session_id or uuid.uuid4().hex
+        config = {"configurable": {"thread_id": session_id}}
 
         events = graph.stream(
-            {"messages": [("system", system_message), ("user", question)]},
+            {"messages": [("user", question)]},
             config,
             stream_mode="values",
         )
@@ -171,7 +224,11 @@ async def chat_endpoint(request: ChatRequest):
                 if msg.type == "ai":
                     yield msg.content + "\n"
 
-        return StreamingResponse(generate_response(), media_type="text/plain")
+        return StreamingResponse(
+            generate_response(),
+            media_type="text/plain",
+            headers={"X-Session-Id": session_id},
+        )
 
         # return {"response": response}
 
@@ -0,0 +1,155 @@
+"""Admission control for /chat: a global in-flight cap and one active run per session."""
+
+import asyncio
+import math
+import time
+from collections import defaultdict
+
+
+class AdmissionRejected(Exception):
+    """The request can't be admitted; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """Held by an admitted request until admission.release(ticket)."""
+
+    __slots__ = ("session_id", "admitted_at", "released")
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.admitted_at = time.monotonic()
+        self.released = False
+
+
+class AdmissionController:
+    """Decides which /chat requests run now, which wait and which get a 429.
+
+    - At most `max_in_flight` graph runs execute at once across the process.
+    - A session runs one request at a time, so two runs never interleave writes into the
+      same thread. With `session_policy="queue"` the next request for a busy session waits
+      its turn; with `"reject"` it is turned away straight away.
+    - At most `max_queue` requests wait at once, and none waits longer than `queue_timeout`.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_in_flight: int = 64,
+        max_queue: int = 256,
+        queue_timeout: float = 30,
+        session_policy: str = "queue",
+    ):
+        if session_policy not in ("queue", "reject"):
+            raise ValueError(f"Unknown session_policy: {session_policy}")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.session_policy = session_policy
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._session_locks: dict[str, asyncio.Lock] = {}
+        self._session_users: defaultdict[str, int] = defaultdict(int)  # so idle locks can be dropped
+        self.in_flight = 0
+        self.waiting = 0
+        self._avg_run_s = 1.0  # moving average of how long an admitted run takes, for Retry-After
+        self.metrics = {
+            "admitted": 0,
+            "rejected_queue_full": 0,
+            "rejected_session_busy": 0,
+            "rejected_timeout": 0,
+            "max_queue_depth": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+        }
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._avg_run_s * (self.waiting + 1) / self.max_in_flight))
+
+    def _reject(self, reason: str, metric: str):
+        self.metrics[metric] += 1
+        return AdmissionRejected(reason, self._retry_after())
+
+    async def acquire(self, session_id: str) -> Ticket:
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = self._session_locks[session_id] = asyncio.Lock()
+        self._session_users[session_id] += 1
+
+        # ~ Fast path: a free slot and an idle session, nothing to wait for
+        if not lock.locked() and not self._slots.locked():
+            await self._acquire_both(lock)  # both are free, so this doesn't suspend
+            return self._admit(session_id, 0.0)
+
+        if lock.locked() and self.session_policy == "reject":
+            self._forget(session_id)
+            raise self._reject("session already has a request in progress", "rejected_session_busy")
+        if self.waiting >= self.max_queue:
+            self._forget(session_id)
+            raise self._reject("too many requests waiting", "rejected_queue_full")
+
+        self.waiting += 1
+        self.metrics["max_queue_depth"] = max(self.metrics["max_queue_depth"], self.waiting)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._acquire_both(lock), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._forget(session_id)
+            raise self._reject("timed out waiting for a free slot", "rejected_timeout") from None
+        except BaseException:
+            self._forget(session_id)
+            raise
+        finally:
+            self.waiting -= 1
+        return self._admit(session_id, (time.monotonic() - started) * 1000)
+
+    def _admit(self, session_id: str, waited_ms: float) -> Ticket:
+        self.metrics["admitted"] += 1
+        self.metrics["total_wait_ms"] += waited_ms
+        self.metrics["max_wait_ms"] = max(self.metrics["max_wait_ms"], waited_ms)
+        self.in_flight += 1
+        return Ticket(session_id)
+
+    async def _acquire_both(self, lock: asyncio.Lock) -> None:
+        # ~ Session first, so a busy session queues behind itself without holding a global slot
+        await lock.acquire()
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            lock.release()
+            raise
+
+    def release(self, ticket: Ticket) -> None:
+        """Give the slot back. Safe to call more than once."""
+        if ticket.released:
+            return
+        ticket.released = True
+        self.in_flight -= 1
+        self._slots.release()
+        self._session_locks[ticket.session_id].release()
+        self._forget(ticket.session_id)
+        run_s = time.monotonic() - ticket.admitted_at
+        self._avg_run_s = 0.9 * self._avg_run_s + 0.1 * run_s
+
+    def _forget(self, session_id: str) -> None:
+        self._session_users[session_id] -= 1
+        if self._session_users[session_id] <= 0:
+            del self._session_users[session_id]
+            lock = self._session_locks.get(session_id)
+            if lock is not None and not lock.locked():
+                del self._session_locks[session_id]
+
+    def stats(self) -> dict:
+        admitted = self.metrics["admitted"]
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "session_policy": self.session_policy,
+            "avg_wait_ms": round(self.metrics["total_wait_ms"] / admitted, 1) if admitted else 0.0,
+            **{k: round(v, 1) if isinstance(v, float) else v for k, v in self.metrics.items()},
+        }
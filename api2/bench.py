@@ -0,0 +1,269 @@
+"""Offline load test for the /chat endpoints.
+
+Swaps the OpenAI model for a deterministic local fake (fixed time to first token, then a
+steady token rate) and the Wikipedia lookup for a fake with fixed latency, serves the real
+app with uvicorn on localhost, and drives it with concurrent multi-turn clients. What is
+left in the numbers is the server's own overhead: graph, checkpointer, tools, streaming.
+
+    python bench.py --clients 50 --turns 4 --endpoint stream
+    python bench.py --clients 200 --first-token-ms 0 --tokens-per-second 1000 --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+#####################################
+# * Fakes
+#####################################
+class FakeChatModel(BaseChatModel):
+    """Stands in for gpt-4o-mini: same answer for the same input, no network.
+
+    Messages containing `tool_keyword` get a wikipedia tool call first, so the
+    chatbot -> tools -> chatbot loop is exercised too.
+    """
+
+    first_token_latency: float = 0.3
+    tokens_per_second: float = 50.0
+    reply_tokens: int = 40
+    tool_keyword: str = "look up"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-bench"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _usage(self, messages, output_tokens: int) -> dict:
+        input_tokens = sum(len(str(m.content)) // 4 + 4 for m in messages)
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _response_metadata(self, messages, output_tokens: int, finish_reason: str) -> dict:
+        # ^ Shaped like what ChatOpenAI attaches, so checkpoint sizes are realistic
+        usage = self._usage(messages, output_tokens)
+        return {
+            "token_usage": {
+                "completion_tokens": usage["output_tokens"],
+                "prompt_tokens": usage["input_tokens"],
+                "total_tokens": usage["total_tokens"],
+                "completion_tokens_details": {"accepted_prediction_tokens": 0, "audio_tokens": 0, "reasoning_tokens": 0, "rejected_prediction_tokens": 0},
+                "prompt_tokens_details": {"audio_tokens": 0, "cached_tokens": 0},
+            },
+            "model_name": "gpt-4o-mini-2024-07-18",
+            "system_fingerprint": "fp_bench000000",
+            "id": f"chatcmpl-bench{len(messages)}",
+            "service_tier": "default",
+            "finish_reason": finish_reason,
+            "logprobs": None,
+        }
+
+    def _reply(self, messages) -> AIMessage:
+        last = messages[-1]
+        if last.type == "human" and self.tool_keyword in str(last.content).lower():
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": "wikipedia", "args": {"query": last.content}, "id": f"call_{len(messages)}"}
+                ],
+                usage_metadata=self._usage(messages, 1),
+                response_metadata=self._response_metadata(messages, 1, "tool_calls"),
+            )
+        return AIMessage(
+            content=" ".join(f"token{i}" for i in range(self.reply_tokens)),
+            usage_metadata=self._usage(messages, self.reply_tokens),
+            response_metadata=self._response_metadata(messages, self.reply_tokens, "stop"),
+        )
+
+    def _duration(self, message: AIMessage) -> float:
+        tokens = 1 if message.tool_calls else self.reply_tokens
+        return self.first_token_latency + tokens / self.tokens_per_second
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._reply(messages)
+        time.sleep(self._duration(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._reply(messages)
+        await asyncio.sleep(self._duration(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._reply(messages)
+        await asyncio.sleep(self.first_token_latency)
+        if message.tool_calls:
+            tool_call = message.tool_calls[0]
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {
+                            "name": tool_call["name"],
+                            "args": json.dumps(tool_call["args"]),
+                            "id": tool_call["id"],
+                            "index": 0,
+                        }
+                    ],
+                    usage_metadata=message.usage_metadata,
+                )
+            )
+            return
+        for i, word in enumerate(message.content.split(" ")):
+            token = word if i == 0 else " " + word
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(1 / self.tokens_per_second)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata))
+
+
+def fake_wikipedia(latency: float):
+    def fetch(query: str) -> str:
+        time.sleep(latency)
+        return f"Page: {query}\nSummary: A short made-up article about {query}."
+
+    return fetch
+
+
+def load_app(args):
+    """Import the real app with the fakes swapped in."""
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench-offline")  # never used, the model is replaced
+    import main
+
+    main.build_graph()  # build now so the lifespan finds it done and keeps the fakes below
+    fake = FakeChatModel(
+        first_token_latency=args.first_token_ms / 1000,
+        tokens_per_second=args.tokens_per_second,
+        reply_tokens=args.reply_tokens,
+    )
+    main.model = fake
+    main.llm_with_tools = fake
+    main.llm_final = fake
+    main.fast_model = fake
+    main.wiki_cache.fetch = fake_wikipedia(args.tool_ms / 1000)
+    return main
+
+
+#####################################
+# * Load generation
+#####################################
+def serve_in_background(app, port: int, **config) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", **config))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+async def run_client(client: httpx.AsyncClient, client_id: int, args, results: list) -> None:
+    session_id = f"bench-{client_id}"
+    path = "/chat/stream" if args.endpoint == "stream" else "/chat"
+    for turn in range(args.turns):
+        # ~ Every `tool_every`-th turn asks for a lookup, the rest are plain questions
+        if args.tool_every and turn % args.tool_every == args.tool_every - 1:
+            message = f"Please look up topic {client_id % 10}"
+        else:
+            message = f"Question {turn} from client {client_id}"
+
+        started = time.perf_counter()
+        first_byte = None
+        async with client.stream(
+            "POST", path, json={"message": message, "session_id": session_id}
+        ) as response:
+            async for chunk in response.aiter_bytes():
+                if first_byte is None and chunk.strip():
+                    first_byte = time.perf_counter()
+        finished = time.perf_counter()
+        results.append(
+            {
+                "status": response.status_code,
+                "latency_ms": (finished - started) * 1000,
+                "ttfb_ms": ((first_byte or finished) - started) * 1000,
+            }
+        )
+
+
+def percentiles(values: list) -> dict:
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+async def drive(args) -> dict:
+    results: list = []
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{args.port}", timeout=None, limits=limits
+    ) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(run_client(client, i, args, results) for i in range(args.clients)))
+        elapsed = time.perf_counter() - started
+
+    ok = [r for r in results if r["status"] == 200]
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2),
+        "latency_ms": {k: round(v, 1) for k, v in percentiles([r["latency_ms"] for r in ok]).items()},
+        "ttfb_ms": {k: round(v, 1) for k, v in percentiles([r["ttfb_ms"] for r in ok]).items()},
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20, help="concurrent clients (one session each)")
+    parser.add_argument("--turns", type=int, default=3, help="requests per client, on the same session")
+    parser.add_argument("--endpoint", choices=["stream", "plain"], default="stream", help="/chat/stream or /chat")
+    parser.add_argument("--first-token-ms", type=float, default=300, help="fake model time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="fake model generation rate")
+    parser.add_argument("--reply-tokens", type=int, default=40, help="tokens per fake answer")
+    parser.add_argument("--tool-ms", type=float, default=200, help="fake Wikipedia latency")
+    parser.add_argument("--tool-every", type=int, default=3, help="every Nth turn triggers a tool call (0 = never)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    app_module = load_app(args)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    server = serve_in_background(app_module.app, args.port)
+    try:
+        report = asyncio.run(drive(args))
+    finally:
+        server.should_exit = True
+
+    # ~ Memory: what the checkpointer says it holds, and how much the process grew (ru_maxrss is KB on Linux)
+    rss_growth_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    report["memory"] = {
+        "rss_growth_per_session_kb": round(rss_growth_kb / args.clients, 1),
+    }
+    if hasattr(app_module.memory, "stats"):
+        stats = app_module.memory.stats()
+        if stats.get("threads"):
+            report["memory"]["checkpoint_bytes_per_session"] = stats["approx_bytes"] // stats["threads"]
+    report["config"] = vars(args)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,84 @@
+"""Checkpoint size benchmark: bytes stored per conversation turn, per storage format.
+
+Runs the real graph (with bench.py's fake model and Wikipedia) through a few
+multi-turn conversations for each checkpointer setup, then reports what the saver holds:
+
+- default:            LangGraph's serializer, every message list stored in full
+- compact:            serde.CompactSerializer (positional rows, no response metadata)
+- compact+delta:      plus message lists stored as deltas between versions
+- compact+delta+zstd: plus zstd on blobs of 512 bytes or more
+- compact+delta+keep_last=5: compact+delta with only the 5 newest checkpoints of each thread kept (the app's default)
+
+    python bench_checkpoints.py --turns 20 --threads 5
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from bench import load_app
+from checkpointers import BoundedMemorySaver
+from serde import CompactSerializer
+
+# ^ keep_last=0: the formats are compared on a thread's full checkpoint history
+SETUPS = {
+    "default": lambda: BoundedMemorySaver(keep_last=0),
+    "compact": lambda: BoundedMemorySaver(keep_last=0, serde=CompactSerializer()),
+    "compact+delta": lambda: BoundedMemorySaver(full_every=8, keep_last=0, serde=CompactSerializer()),
+    "compact+delta+zstd": lambda: BoundedMemorySaver(full_every=8, keep_last=0, serde=CompactSerializer(compress=True)),
+    "compact+delta+keep_last=5": lambda: BoundedMemorySaver(full_every=8, keep_last=5, serde=CompactSerializer()),
+}
+
+
+async def converse(graph, thread_id: str, turns: int, tool_every: int) -> None:
+    config = {"configurable": {"thread_id": thread_id}}
+    for turn in range(turns):
+        if tool_every and turn % tool_every == tool_every - 1:
+            message = f"Please look up topic {turn}"
+        else:
+            message = f"Question {turn}: tell me something about the number {turn * 7}"
+        await graph.ainvoke({"messages": [("user", message)]}, config)
+
+
+async def measure(main, saver, args) -> dict:
+    graph = main.compiled_graph.copy(update={"checkpointer": saver})
+    await asyncio.gather(*(converse(graph, f"t{i}", args.turns, args.tool_every) for i in range(args.threads)))
+
+    # ~ Reading the latest state back is what every new turn pays
+    started = time.perf_counter()
+    for i in range(args.threads):
+        state = await graph.aget_state({"configurable": {"thread_id": f"t{i}"}})
+    read_ms = (time.perf_counter() - started) * 1000 / args.threads
+
+    stats = saver.stats()
+    return {
+        "bytes": stats["approx_bytes"],
+        "bytes_per_turn": round(stats["approx_bytes"] / (args.threads * args.turns)),
+        "read_state_ms": round(read_ms, 3),
+        "messages_in_state": len(state.values["messages"]),
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20, help="turns per conversation")
+    parser.add_argument("--threads", type=int, default=5, help="conversations per setup")
+    parser.add_argument("--tool-every", type=int, default=3, help="every Nth turn triggers a tool call (0 = never)")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    main = load_app(
+        argparse.Namespace(first_token_ms=0, tokens_per_second=1e6, reply_tokens=60, tool_ms=0)
+    )
+    report = {name: asyncio.run(measure(main, setup(), args)) for name, setup in SETUPS.items()}
+    report["config"] = vars(args)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
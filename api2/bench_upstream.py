@@ -0,0 +1,149 @@
+"""Connection reuse benchmark for the OpenAI client, against a local mock of the API.
+
+Sends the same chat completions through two setups and counts how many connections
+the mock server had to accept:
+
+- fresh:  a new model with its own HTTP client per request (what building a model per
+          request, as the streaming example in api/doc.py used to, costs)
+- shared: one model on the pooled `OpenAIClients` for every request (what main.py does)
+
+With --tls the mock serves HTTPS with a throwaway self-signed certificate, so every new
+connection also pays a TLS handshake.
+
+    python bench_upstream.py --requests 500 --concurrency 20 --tls
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from langchain.chat_models import init_chat_model
+
+from bench import percentiles, serve_in_background
+from llm_clients import OpenAIClients
+
+
+def mock_openai(latency: float) -> tuple[FastAPI, set]:
+    """A /v1/chat/completions that answers "ok", and the set of client (host, port) seen."""
+    app = FastAPI()
+    connections: set = set()
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        connections.add(tuple(request.scope["client"]))  # one source port per TCP connection
+        await request.body()
+        await asyncio.sleep(latency)
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4o-mini",
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}
+            ],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 1, "total_tokens": 13},
+        }
+
+    return app, connections
+
+
+def self_signed_cert(directory: str) -> tuple[str, str]:
+    key, cert = os.path.join(directory, "key.pem"), os.path.join(directory, "cert.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True,
+        capture_output=True,
+    )
+    return key, cert
+
+
+async def run_mode(mode: str, args, base_url: str, verify) -> list:
+    latencies: list = []
+    shared = OpenAIClients(max_connections=args.pool_size, max_keepalive=args.pool_size, verify=verify)
+    shared_model = shared.chat_model("gpt-4o-mini", base_url=base_url, api_key="sk-bench", max_retries=0)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            if mode == "shared":
+                await shared_model.ainvoke(f"question {i}")
+            else:
+                client = httpx.AsyncClient(verify=verify)
+                model = init_chat_model(
+                    model="gpt-4o-mini",
+                    model_provider="openai",
+                    base_url=base_url,
+                    api_key="sk-bench",
+                    max_retries=0,
+                    http_async_client=client,
+                )
+                try:
+                    await model.ainvoke(f"question {i}")
+                finally:
+                    await client.aclose()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    await shared.aclose()
+    return latencies
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=20, help="max connections of the shared pool")
+    parser.add_argument("--latency-ms", type=float, default=20, help="mock server time per completion")
+    parser.add_argument("--tls", action="store_true", help="serve HTTPS, so new connections pay a TLS handshake")
+    parser.add_argument("--port", type=int, default=8766, help="first of the two ports the mocks use")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        ssl_files = self_signed_cert(tmp) if args.tls else None
+        for offset, mode in enumerate(("fresh", "shared")):
+            # ~ A fresh mock (and port) per mode, so each counts only its own connections
+            port = args.port + offset
+            app, connections = mock_openai(args.latency_ms / 1000)
+            server = serve_in_background(
+                app,
+                port,
+                ssl_keyfile=ssl_files[0] if ssl_files else None,
+                ssl_certfile=ssl_files[1] if ssl_files else None,
+            )
+            scheme = "https" if ssl_files else "http"
+            verify = ssl.create_default_context(cafile=ssl_files[1]) if ssl_files else True
+            try:
+                started = time.perf_counter()
+                latencies = asyncio.run(run_mode(mode, args, f"{scheme}://127.0.0.1:{port}/v1", verify))
+                elapsed = time.perf_counter() - started
+            finally:
+                server.should_exit = True
+            report[mode] = {
+                "requests": len(latencies),
+                "connections_opened": len(connections),
+                "elapsed_s": round(elapsed, 3),
+                "throughput_rps": round(len(latencies) / elapsed, 1),
+                "latency_ms": {k: round(v, 1) for k, v in percentiles(latencies).items()},
+            }
+    report["config"] = vars(args)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,59 @@
+"""Per-turn limits for the chatbot <-> tools loop, and what each turn actually used.
+
+Without a cap, a model that keeps asking for tools keeps the loop (and a worker slot) busy
+for as long as it likes. A `TurnBudget` travels with one graph run (in the run's
+configurable) and the nodes check it:
+
+- deadline:   the turn has `deadline_seconds` in total; the last `reserve_seconds` of it are
+              kept for the final answer, so tools are cut off before the deadline itself
+- tool rounds: at most `max_tool_rounds` chatbot -> tools round trips
+
+Once either runs out, the chatbot node answers with what it has instead of calling tools.
+"""
+
+import time
+from typing import Optional
+
+DEADLINE = "deadline"
+STEPS = "steps"
+
+
+class TurnBudget:
+    def __init__(self, deadline_seconds: float = 60, max_tool_rounds: int = 5, reserve_seconds: float = 10):
+        self.started = time.perf_counter()
+        self.deadline = self.started + deadline_seconds
+        self.max_tool_rounds = max_tool_rounds
+        self.reserve_seconds = min(reserve_seconds, deadline_seconds / 2)
+        # ~ Hops used so far
+        self.llm_calls = 0
+        self.tool_rounds = 0
+        self.tool_calls = 0
+        self.exhausted_by: Optional[str] = None
+        self.finished: Optional[float] = None  # set by the run once the turn is over
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.perf_counter())
+
+    def tool_time(self) -> float:
+        """How long the next tools round may take, keeping the reserve for the final answer."""
+        return max(0.0, self.remaining() - self.reserve_seconds)
+
+    def exhausted(self) -> Optional[str]:
+        """Why the loop must stop calling tools now (DEADLINE or STEPS), or None if it may go on."""
+        if self.tool_time() <= 0:
+            return DEADLINE
+        if self.tool_rounds >= self.max_tool_rounds:
+            return STEPS
+        return None
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    def usage(self) -> dict:
+        return {
+            "llm_calls": self.llm_calls,
+            "tool_rounds": self.tool_rounds,
+            "tool_calls": self.tool_calls,
+            "elapsed_ms": round(((self.finished or time.perf_counter()) - self.started) * 1000, 1),
+            "exhausted_by": self.exhausted_by,
+        }
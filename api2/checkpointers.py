@@ -0,0 +1,606 @@
+"""Checkpointers (conversation memory) for the LangGraph chat graph."""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+import ormsgpack
+from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+
+#####################################
+# * Bounded in-memory checkpointer
+#####################################
+_MISSING = object()
+
+
+def _fingerprint(message) -> bytes:
+    # ^ Every field: add_messages may replace a message by id with new tool_calls but the same content.
+    # ^ A digest rather than hash(), which is salted per process
+    packed = ormsgpack.packb(
+        message, option=ormsgpack.OPT_SERIALIZE_PYDANTIC | ormsgpack.OPT_NON_STR_KEYS, default=repr
+    )
+    return hashlib.blake2b(packed, digest_size=16).digest()
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """An InMemorySaver that only keeps the `max_threads` most recently used threads.
+
+    Threads are evicted least-recently-used first, and any thread that has been idle
+    for longer than `ttl_seconds` is dropped the next time the saver is touched, so
+    RAM stays flat no matter how many sessions come through /chat. Within a thread only the
+    `keep_last` newest checkpoints (and the blobs they still reference) are kept, as in
+    SqliteSaver; 0 keeps them all. Reading a thread that holds no checkpoints doesn't count
+    as using it.
+
+    With `full_every` > 0, message lists are stored as deltas: every super-step writes a
+    new version of the messages channel, and InMemorySaver keeps each version in full, so
+    a thread's storage grows with the square of its length. A delta stores only which run
+    of the previous version is kept plus the new messages, and every `full_every`-th
+    version is stored in full so a read never replays a long chain.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int = 1000,
+        ttl_seconds: float = 3600,
+        full_every: int = 0,
+        keep_last: int = 5,
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self.full_every = full_every
+        self.keep_last = keep_last
+        self.evicted = 0
+        self.expired = 0
+        self._lock = threading.RLock()
+        # thread_id -> last access time, oldest first
+        self._last_seen: OrderedDict[str, float] = OrderedDict()
+        # thread_id -> keys it owns in self.blobs / self.writes, so eviction never scans other threads
+        self._blob_keys: defaultdict[str, set] = defaultdict(set)
+        self._write_keys: defaultdict[str, set] = defaultdict(set)
+        # thread_id -> {(checkpoint_ns, channel): (version, message fingerprints, deltas since full)}
+        self._heads: defaultdict[str, dict] = defaultdict(dict)
+        # thread_id -> {(checkpoint_ns, checkpoint_id): channel_versions}, to know which blobs are still used
+        self._versions: defaultdict[str, dict] = defaultdict(dict)
+        # thread_id -> {blob key of a delta: version of its base}
+        self._delta_bases: defaultdict[str, dict] = defaultdict(dict)
+
+    def _touch(self, thread_id: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            # ~ Drop idle threads (oldest first, so we can stop at the first fresh one)
+            while self._last_seen:
+                oldest, seen = next(iter(self._last_seen.items()))
+                if oldest == thread_id or now - seen <= self.ttl_seconds:
+                    break
+                self._drop(oldest)
+                self.expired += 1
+
+            self._last_seen[thread_id] = now
+            self._last_seen.move_to_end(thread_id)
+
+            # ~ Then enforce the hard cap, least recently used first
+            while len(self._last_seen) > self.max_threads:
+                oldest = next(iter(self._last_seen))
+                self._drop(oldest)
+                self.evicted += 1
+
+    def _drop(self, thread_id: str) -> None:
+        self._last_seen.pop(thread_id, None)
+        self.storage.pop(thread_id, None)
+        self._heads.pop(thread_id, None)
+        self._versions.pop(thread_id, None)
+        self._delta_bases.pop(thread_id, None)
+        for key in self._blob_keys.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+        for key in self._write_keys.pop(thread_id, ()):
+            self.writes.pop(key, None)
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            if thread_id not in self.storage:
+                # ^ A new or evicted thread: no LRU entry (it could push a live thread out), and
+                # ^ InMemorySaver.get_tuple would leave an empty one in self.storage
+                return None
+            self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        self._touch(thread_id)
+        with self._lock:
+            deltas = {}
+            if self.full_every:
+                values = checkpoint["channel_values"]
+                for k, v in new_versions.items():
+                    if (delta := self._delta(thread_id, checkpoint_ns, k, v, values.get(k))) is not None:
+                        deltas[(thread_id, checkpoint_ns, k, v)] = delta
+                if deltas:
+                    delta_channels = {key[2] for key in deltas}
+                    checkpoint = {
+                        **checkpoint,
+                        "channel_values": {k: v for k, v in values.items() if k not in delta_channels},
+                    }
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            self.blobs.update(deltas)
+            self._blob_keys[thread_id].update(
+                (thread_id, checkpoint_ns, k, v) for k, v in new_versions.items()
+            )
+            self._versions[thread_id][(checkpoint_ns, checkpoint["id"])] = dict(checkpoint["channel_versions"])
+            if self.keep_last:
+                self._prune(thread_id, checkpoint_ns)
+        return next_config
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Drop all but the `keep_last` newest checkpoints of the thread, their writes and unused blobs."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.keep_last:
+            return
+        versions = self._versions[thread_id]
+        for checkpoint_id in sorted(checkpoints)[: -self.keep_last]:
+            del checkpoints[checkpoint_id]
+            versions.pop((checkpoint_ns, checkpoint_id), None)
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            self._write_keys[thread_id].discard((thread_id, checkpoint_ns, checkpoint_id))
+
+        # ~ Blobs a kept checkpoint reads, including the bases its deltas are built on
+        bases = self._delta_bases[thread_id]
+        live = set()
+        for (ns, _), channel_versions in versions.items():
+            if ns != checkpoint_ns:
+                continue
+            for channel, version in channel_versions.items():
+                key = (thread_id, ns, channel, version)
+                while key is not None and key not in live:
+                    live.add(key)
+                    key = (thread_id, ns, channel, bases[key]) if key in bases else None
+        blob_keys = self._blob_keys[thread_id]
+        for key in [k for k in blob_keys if k[1] == checkpoint_ns and k not in live]:
+            self.blobs.pop(key, None)
+            bases.pop(key, None)
+            blob_keys.discard(key)
+
+    def _delta(self, thread_id: str, checkpoint_ns: str, channel: str, version, value):
+        """The ("delta", ...) blob for `value` against this channel's previous version, or None to store it in full."""
+        heads = self._heads[thread_id]
+        if not isinstance(value, list) or not value or not isinstance(value[0], BaseMessage):
+            heads.pop((checkpoint_ns, channel), None)
+            return None
+        fingerprints = [_fingerprint(m) for m in value]
+        head = heads.get((checkpoint_ns, channel))
+        if head is None or head[2] + 1 >= self.full_every:
+            heads[(checkpoint_ns, channel)] = (version, fingerprints, 0)
+            return None
+
+        base_version, base, depth = head
+        # ~ The new list is a run of the old one (older turns may have been dropped from the front) plus new messages
+        try:
+            start = base.index(fingerprints[0])
+        except ValueError:
+            start = 0
+        keep = 0
+        while keep < len(fingerprints) and start + keep < len(base) and base[start + keep] == fingerprints[keep]:
+            keep += 1
+        if keep == 0:
+            heads[(checkpoint_ns, channel)] = (version, fingerprints, 0)
+            return None
+        heads[(checkpoint_ns, channel)] = (version, fingerprints, depth + 1)
+        self._delta_bases[thread_id][(thread_id, checkpoint_ns, channel, version)] = base_version
+        type_, data = self.serde.dumps_typed(value[keep:])
+        return "delta", ormsgpack.packb([base_version, start, keep, type_, data])
+
+    def _load_blobs(self, thread_id, checkpoint_ns, versions):
+        result = {}
+        for k, version in versions.items():
+            value = self._load_value(thread_id, checkpoint_ns, k, version)
+            if value is not _MISSING:
+                result[k] = value
+        return result
+
+    def _load_value(self, thread_id, checkpoint_ns, channel, version):
+        blob = self.blobs.get((thread_id, checkpoint_ns, channel, version))
+        if blob is None or blob[0] == "empty":
+            return _MISSING
+        if blob[0] == "delta":
+            base_version, start, keep, type_, data = ormsgpack.unpackb(blob[1])
+            base = self._load_value(thread_id, checkpoint_ns, channel, base_version)
+            return base[start : start + keep] + self.serde.loads_typed((type_, data))
+        return self.serde.loads_typed(blob)
+
+    def get_delta_channel_history(self, *, config, channels):
+        # ^ InMemorySaver's override reads self.blobs directly and can't resolve a "delta" blob;
+        # ^ the base implementation goes through get_tuple, and so through _load_value
+        return BaseCheckpointSaver.get_delta_channel_history(self, config=config, channels=channels)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        self._touch(thread_id)
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            self._write_keys[thread_id].add(
+                (
+                    thread_id,
+                    config["configurable"].get("checkpoint_ns", ""),
+                    config["configurable"]["checkpoint_id"],
+                )
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._drop(thread_id)
+
+    def stats(self) -> dict:
+        """Report how many threads are held and roughly how many bytes they take up."""
+        with self._lock:
+            checkpoints = sum(
+                len(cps) for ns in self.storage.values() for cps in ns.values()
+            )
+            size = sum(len(blob[1]) for blob in self.blobs.values())
+            size += sum(
+                len(cp[1]) + len(meta[1])
+                for ns in self.storage.values()
+                for cps in ns.values()
+                for cp, meta, _ in cps.values()
+            )
+            size += sum(
+                len(write[2][1]) for ws in self.writes.values() for write in ws.values()
+            )
+            return {
+                "threads": len(self._last_seen),
+                "full_every": self.full_every,
+                "keep_last": self.keep_last,
+                "max_threads": self.max_threads,
+                "ttl_seconds": self.ttl_seconds,
+                "checkpoints": checkpoints,
+                "approx_bytes": size,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
+
+
+#####################################
+# * Durable SQLite checkpointer
+#####################################
+# ^ Prefix of the `type` column for checkpoints whose channel values were serialized one by one
+_CHANNELS = "channels+"
+
+
+class SqliteSaver(BaseCheckpointSaver):
+    """A file-backed checkpointer so conversations survive a restart.
+
+    - The database runs in WAL mode with `synchronous=NORMAL`, so a commit never waits on fsync.
+    - `put` / `put_writes` only buffer rows; a background thread flushes everything a
+      super-step produced in one transaction every `flush_interval` seconds (or as soon as
+      `max_batch` rows are waiting). Reads see buffered rows, so a graph run never blocks on disk.
+    - On every flush each touched thread is compacted down to its `keep_last` newest checkpoints.
+    - Every checkpoint stores the full channel values, so resuming a thread loads exactly one row.
+      Each channel value is serialized on its own, so a message list goes through the
+      serializer's list path (`CompactSerializer` rows) instead of being buried in the checkpoint dict.
+    """
+
+    def __init__(
+        self,
+        path: str = "checkpoints.sqlite",
+        *,
+        flush_interval: float = 0.5,
+        max_batch: int = 256,
+        keep_last: int = 5,
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.keep_last = keep_last
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                type TEXT,
+                checkpoint BLOB,
+                metadata_type TEXT,
+                metadata BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                type TEXT,
+                value BLOB,
+                task_path TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+            """
+        )
+        # (thread_id, ns, checkpoint_id) -> checkpoint row waiting to be flushed
+        self._pending_checkpoints: dict[tuple, tuple] = {}
+        # (thread_id, ns, checkpoint_id, task_id, idx) -> write row waiting to be flushed
+        self._pending_writes: dict[tuple, tuple] = {}
+        self.flushes = 0
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="sqlite-saver-flush", daemon=True)
+        self._flusher.start()
+
+    # ~ Flushing
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write every buffered row to disk in a single transaction."""
+        with self._lock:
+            if not self._pending_checkpoints and not self._pending_writes:
+                return
+            checkpoints = list(self._pending_checkpoints.values())
+            writes = list(self._pending_writes.values())
+            touched = {(row[0], row[1]) for row in checkpoints}
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    checkpoints,
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    writes,
+                )
+                for thread_id, checkpoint_ns in touched:
+                    self._compact(thread_id, checkpoint_ns)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._pending_checkpoints.clear()
+            self._pending_writes.clear()
+            self.flushes += 1
+
+    def _compact(self, thread_id: str, checkpoint_ns: str) -> None:
+        stale = self._conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_last),
+        ).fetchall()
+        if not stale:
+            return
+        params = [(thread_id, checkpoint_ns, row[0]) for row in stale]
+        self._conn.executemany(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            params,
+        )
+        self._conn.executemany(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            params,
+        )
+
+    def close(self) -> None:
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ~ Reads
+    def _load_checkpoint_row(self, thread_id: str, checkpoint_ns: str, checkpoint_id):
+        if checkpoint_id:
+            row = self._pending_checkpoints.get((thread_id, checkpoint_ns, checkpoint_id))
+            if row is None:
+                row = self._conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            return row
+        # ^ Latest checkpoint only: newest buffered row vs newest row on disk
+        pending = [
+            row
+            for key, row in self._pending_checkpoints.items()
+            if key[0] == thread_id and key[1] == checkpoint_ns
+        ]
+        stored = self._conn.execute(
+            "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1",
+            (thread_id, checkpoint_ns),
+        ).fetchone()
+        if stored is not None:
+            pending.append(stored)
+        return max(pending, key=lambda row: row[2], default=None)
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list:
+        rows = {
+            (row[3], row[4]): row
+            for row in self._conn.execute(
+                "SELECT * FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+        }
+        for key, row in self._pending_writes.items():
+            if key[:3] == (thread_id, checkpoint_ns, checkpoint_id):
+                rows[(row[3], row[4])] = row
+        ordered = sorted(rows.values(), key=lambda row: writes_sort_key(row[8], row[3], row[4]))
+        return [
+            (task_id, channel, self.serde.loads_typed((type_, value)))
+            for _, _, _, task_id, _, channel, type_, value, _ in ordered
+        ]
+
+    def _dumps_checkpoint(self, checkpoint) -> tuple[str, bytes]:
+        channel_values = {
+            channel: list(self.serde.dumps_typed(value)) for channel, value in checkpoint["channel_values"].items()
+        }
+        type_, data = self.serde.dumps_typed({**checkpoint, "channel_values": channel_values})
+        return _CHANNELS + type_, data
+
+    def _loads_checkpoint(self, type_: str, data: bytes):
+        if not type_.startswith(_CHANNELS):
+            return self.serde.loads_typed((type_, data))  # written before channel values were split out
+        checkpoint = self.serde.loads_typed((type_.removeprefix(_CHANNELS), data))
+        checkpoint["channel_values"] = {
+            channel: self.serde.loads_typed(tuple(value)) for channel, value in checkpoint["channel_values"].items()
+        }
+        return checkpoint
+
+    def _to_tuple(self, row) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self._loads_checkpoint(type_, checkpoint),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            row = self._load_checkpoint_row(thread_id, checkpoint_ns, get_checkpoint_id(config))
+            return self._to_tuple(row) if row is not None else None
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        self.flush()
+        query = "SELECT * FROM checkpoints"
+        where, params = [], []
+        if config is not None:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            tuples = [self._to_tuple(row) for row in rows]
+        for checkpoint_tuple in tuples:
+            if filter and any(checkpoint_tuple.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield checkpoint_tuple
+
+    # ~ Writes (buffered)
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized_checkpoint = self._dumps_checkpoint(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        with self._lock:
+            self._pending_checkpoints[(thread_id, checkpoint_ns, checkpoint["id"])] = (
+                thread_id,
+                checkpoint_ns,
+                checkpoint["id"],
+                config["configurable"].get("checkpoint_id"),  # parent
+                type_,
+                serialized_checkpoint,
+                metadata_type,
+                serialized_metadata,
+            )
+            backlog = len(self._pending_checkpoints) + len(self._pending_writes)
+        if backlog >= self.max_batch:
+            self.flush()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            for idx, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, idx)
+                key = (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                # ^ Regular writes are idempotent, special ones (errors, interrupts) overwrite
+                if idx >= 0 and key in self._pending_writes:
+                    continue
+                type_, serialized = self.serde.dumps_typed(value)
+                self._pending_writes[key] = (*key, channel, type_, serialized, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for key in [k for k in self._pending_checkpoints if k[0] == thread_id]:
+                del self._pending_checkpoints[key]
+            for key in [k for k in self._pending_writes if k[0] == thread_id]:
+                del self._pending_writes[key]
+            self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    # ~ Async versions (nothing here blocks on disk for long, so they just call the sync ones)
+    async def aget_tuple(self, config):
+        return self.get_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for checkpoint_tuple in self.list(config, filter=filter, before=before, limit=limit):
+            yield checkpoint_tuple
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return self.delete_thread(thread_id)
@@ -0,0 +1,108 @@
+"""Starts each tool call while the model is still generating the rest of its answer.
+
+With `ainvoke`, a message asking for three lookups is only seen once the last argument of
+the last call has been generated; only then does the tools node start them. Streamed, each
+call's arguments arrive as JSON fragments under their own index, and a call is complete as
+soon as its fragments parse as a JSON object. `EagerToolExecutor.ainvoke` streams the model
+call, starts every call at that point, and the tools node collects the results with `take`.
+
+Running calls are keyed by (run, tool_call_id), the run being the thread id: tool call ids
+are only unique within one conversation. A call is not started once the turn's budget is
+exhausted, since the tools node wouldn't run it either.
+"""
+
+import asyncio
+import json
+import time
+from typing import Optional
+
+from langchain_core.messages import AIMessage, ToolMessage, message_chunk_to_message
+from langgraph.prebuilt.tool_node import TOOL_CALL_ERROR_TEMPLATE
+
+
+class EagerToolExecutor:
+    def __init__(self, tools: list):
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self._running: dict[tuple, asyncio.Task] = {}  # (run, tool_call_id) -> task
+        self.counters = {"early": 0, "late": 0, "head_start_seconds": 0.0}
+
+    async def ainvoke(self, model, messages: list, run: str, budget=None, **kwargs) -> AIMessage:
+        """`model.ainvoke(messages)`, except each tool call starts as soon as its arguments are in.
+
+        With a `budget` (a TurnBudget), calls are only started while `budget.exhausted()` is None.
+        """
+        calls: dict[int, dict] = {}  # chunk index -> {"id", "name", "args"}, args as streamed so far
+        started: dict[str, float] = {}  # tool_call_id -> when it was started
+        full = None
+        try:
+            async for chunk in model.astream(messages, stream_usage=True, **kwargs):
+                full = chunk if full is None else full + chunk
+                for part in chunk.tool_call_chunks:
+                    call = calls.setdefault(part["index"], {"id": None, "name": None, "args": "", "started": False})
+                    call["id"] = call["id"] or part.get("id")
+                    call["name"] = call["name"] or part.get("name")
+                    call["args"] += part.get("args") or ""
+                    if call["started"] or (budget is not None and budget.exhausted() is not None):
+                        continue
+                    if (args := self._complete(call)) is not None:
+                        call["started"] = True
+                        started[call["id"]] = time.perf_counter()
+                        tool_call = {"id": call["id"], "name": call["name"], "args": args, "type": "tool_call"}
+                        self._running[run, call["id"]] = asyncio.create_task(self._run(tool_call))
+        except BaseException:
+            self.discard(run, list(started))
+            raise
+
+        if full is None:
+            # ^ The stream ended without a single chunk: nothing was started, ask again without streaming
+            return await model.ainvoke(messages, **kwargs)
+        stream_ended = time.perf_counter()
+        self.counters["head_start_seconds"] += sum(stream_ended - at for at in started.values())
+        self.counters["early"] += len(started)
+        return message_chunk_to_message(full)
+
+    def _complete(self, call: dict) -> Optional[dict]:
+        """The call's arguments once they form a whole JSON object for a known tool, else None."""
+        if not call["id"] or call["name"] not in self.tools_by_name:
+            return None
+        try:
+            args = json.loads(call["args"])
+        except ValueError:
+            return None  # still streaming
+        return args if isinstance(args, dict) else None
+
+    async def _run(self, call: dict) -> ToolMessage:
+        try:
+            return await self.tools_by_name[call["name"]].ainvoke(call)
+        except Exception as e:
+            # ^ Same error message ToolNode gives the model, so it can retry the call
+            return ToolMessage(
+                content=TOOL_CALL_ERROR_TEMPLATE.format(error=repr(e)),
+                name=call["name"],
+                tool_call_id=call["id"],
+                status="error",
+            )
+
+    def take(self, run: str, tool_call_id: str) -> Optional[asyncio.Task]:
+        """The task already running `tool_call_id`, if it was started early (then it's handed over)."""
+        return self._running.pop((run, tool_call_id), None)
+
+    def discard(self, run: str, tool_call_ids: list) -> None:
+        """Cancel calls that were started but will never be collected."""
+        for call_id in tool_call_ids:
+            if (task := self.take(run, call_id)) is not None:
+                task.cancel()
+
+    def discard_run(self, run: str) -> None:
+        """Cancel every call still held for `run`; called once its graph run is over, however it ended."""
+        self.discard(run, [call_id for key, call_id in self._running if key == run])
+
+    def stats(self) -> dict:
+        early = self.counters["early"]
+        return {
+            "running": len(self._running),
+            "early": early,
+            "late": self.counters["late"],
+            # ^ How long, on average, an early call had been running when the model finished
+            "avg_head_start_ms": round(self.counters["head_start_seconds"] / early * 1000, 1) if early else 0.0,
+        }
@@ -0,0 +1,95 @@
+"""Keeps the prompt size flat: a token-budgeted window of recent turns plus a running summary."""
+
+import logging
+from functools import lru_cache
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+logger = logging.getLogger(__name__)
+
+# ~ Chat format overhead per message (role, separators), as in OpenAI's token counting guide
+TOKENS_PER_MESSAGE = 4
+
+
+@lru_cache(maxsize=1)
+def load_encoding():
+    """The o200k_base tokenizer (gpt-4o family), or None to estimate ~4 characters per token.
+
+    The first load downloads the BPE file unless it is already in TIKTOKEN_CACHE_DIR, so the
+    app calls this once at startup, off the event loop, rather than on the first turn.
+    """
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:  # not installed, or the BPE file can't be fetched
+        logger.warning("tiktoken encoding unavailable (%r); history windows use a ~4 chars/token estimate", e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = load_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1  # ~4 characters per token for English
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def message_tokens(message) -> int:
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    tokens = TOKENS_PER_MESSAGE + count_tokens(content)
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += count_tokens(tool_call["name"]) + count_tokens(str(tool_call["args"]))
+    return tokens
+
+
+def split_history(messages: list, budget: int) -> tuple[list, list]:
+    """Split `messages` into (older, recent) so that `recent` fits in `budget` tokens.
+
+    The cut is always made right before a human message, so an AI message is never separated
+    from the tool results it asked for. The latest turn is always kept, even if it alone is
+    over budget.
+    """
+    total = 0
+    cut = None
+    for i in range(len(messages) - 1, -1, -1):
+        total += message_tokens(messages[i])
+        if total > budget and cut is not None:
+            break
+        if isinstance(messages[i], HumanMessage):
+            cut = i
+    if not cut:
+        return [], messages
+    return messages[:cut], messages[cut:]
+
+
+def _transcript(messages: list) -> str:
+    lines = []
+    for message in messages:
+        if message.type == "system":
+            continue
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        lines.append(f"{message.type}: {content}")
+    return "\n".join(lines)
+
+
+SUMMARIZER_PROMPT = SystemMessage(
+    content="You maintain a short running summary of a chat between a user and an AI assistant. "
+    "Keep names, facts, numbers and open questions; drop pleasantries. Reply with the summary only."
+)
+
+
+async def summarize(model, summary: str, messages: list):
+    """Fold `messages` into the running `summary` with one call to `model`.
+
+    Returns the model's reply, whose content is the new summary (and whose usage_metadata
+    the caller counts).
+    """
+    if summary:
+        instruction = (
+            f"This is the summary of the conversation so far:\n{summary}\n\n"
+            "Extend it with the new messages below."
+        )
+    else:
+        instruction = "Summarize the conversation below."
+    prompt = [SUMMARIZER_PROMPT, HumanMessage(content=f"{instruction}\n\n{_transcript(messages)}")]
+    return await model.ainvoke(prompt)
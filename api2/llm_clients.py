@@ -0,0 +1,80 @@
+"""One pooled HTTP client pair for every OpenAI call this process makes.
+
+The model is built once and handed these clients, so requests reuse warm keep-alive
+connections instead of paying a TCP + TLS handshake each. Per-request behaviour
+(streaming callbacks, tags, run names) goes in the `config` of the call, never into a
+new model instance:
+
+    await llm_with_tools.ainvoke(messages, config={"callbacks": [handler]})
+"""
+
+import importlib.util
+from typing import Optional
+
+import httpx
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (`pip install httpx[http2]`)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class OpenAIClients:
+    """A sync and an async httpx client sharing the same pool settings.
+
+    - `max_connections` caps concurrent upstream connections (per client).
+    - `max_keepalive` idle connections stay open for `keepalive_expiry` seconds.
+    - `http2=True` multiplexes concurrent requests over one connection; it falls back
+      to HTTP/1.1 when `h2` isn't installed.
+
+    Nothing connects until the first request, so the clients can be built before a fork,
+    but each worker then opens its own connections.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 60,
+        http2: bool = True,
+        timeout: float = 60,
+        connect_timeout: float = 5,
+        verify=True,
+    ):
+        self.http2 = http2 and http2_available()
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        timeouts = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = limits
+        self.sync = httpx.Client(limits=limits, timeout=timeouts, http2=self.http2, verify=verify)
+        self.async_ = httpx.AsyncClient(limits=limits, timeout=timeouts, http2=self.http2, verify=verify)
+
+    def chat_model(self, model: str = "gpt-4o-mini", base_url: Optional[str] = None, **kwargs):
+        """An OpenAI chat model that sends every call through these clients."""
+        from langchain.chat_models import init_chat_model
+
+        if base_url:
+            kwargs["base_url"] = base_url
+        return init_chat_model(
+            model=model,
+            model_provider="openai",
+            http_client=self.sync,
+            http_async_client=self.async_,
+            **kwargs,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+        }
+
+    async def aclose(self) -> None:
+        self.sync.close()
+        await self.async_.aclose()
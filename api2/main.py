@@ -1,27 +1,267 @@
-from fastapi import FastAPI, Request
+import time
+
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from contextlib import aclosing, asynccontextmanager, contextmanager
 from dotenv import load_dotenv
-import os
+import os, uuid, json, asyncio, logging
 from pydantic import BaseModel
-from typing import Annotated
+from typing import Annotated, Optional
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode, tools_condition
 
-from langchain.chat_models import init_chat_model
-from langchain_community.utilities import WikipediaAPIWrapper
-from langchain_community.tools import WikipediaQueryRun
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import Tool
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
 
-from langchain_experimental.utilities import PythonREPL
 from langgraph.checkpoint.memory import InMemorySaver
 
-memory = InMemorySaver()
+from checkpointers import BoundedMemorySaver, SqliteSaver
+from serde import CompactSerializer
+from repl_pool import ReplPool
+from tool_cache import LookupCache, cached_tool
+from prefetch import Prefetcher
+from eager_tools import EagerToolExecutor
+from response_cache import ResponseCache, cacheable_question, normalize_text
+from history import load_encoding, split_history, summarize
+from admission import AdmissionController, AdmissionRejected
+from llm_clients import OpenAIClients
+from metrics import Registry, instrument_checkpointer, instrument_tool
+from single_flight import SingleFlight
+from prompts import PromptRegistry
+from budget import DEADLINE, TurnBudget
+import router
+
+# ~ The model, the tools (langchain_community is the slow import) and the compiled graph are built
+# ~ in build_graph(), at startup rather than import time. Set PRELOAD_GRAPH=1 with `gunicorn --preload`
+# ~ to build them once in the master so every forked worker shares the same compiled graph.
+llm_clients = None  # pooled keep-alive HTTP clients shared by every OpenAI call
+model = None
+llm_with_tools = None
+llm_final = None  # the same model and tools with tool_choice="none", for answers once the turn's budget is spent
+fast_model = None  # small model without tools, for the router's fast path
+wiki_cache = None
+prefetcher = None  # speculative Wikipedia lookups (WIKI_PREFETCH=1)
+eager_tools = None  # starts tool calls while the model is still streaming (EAGER_TOOLS=1)
+tools = None
+compiled_graph = None  # compiled without a checkpointer, safe to build before forking
+memory = None  # per process, see build_checkpointer()
+graph = None  # compiled_graph bound to this process's checkpointer
+
+# ~ How long each startup phase took, in ms (GET /startup)
+startup_phases = {}
+
+
+@contextmanager
+def startup_phase(name: str):
+    started = time.perf_counter()
+    yield
+    startup_phases[name] = round((time.perf_counter() - started) * 1000, 1)
+
 
 load_dotenv()
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o-mini")
+FAST_MODEL = os.getenv("FAST_MODEL", "gpt-4.1-nano")
+# ~ ROUTER=1 sends greetings to a canned reply and small talk to FAST_MODEL; the rest goes to CHAT_MODEL
+ROUTER_ENABLED = os.getenv("ROUTER", "1") == "1"
+# ~ WIKI_PREFETCH=1 starts the Wikipedia lookup a factual question will probably need at the
+# ~ same time as the first model call, instead of after it (see prefetch.py)
+PREFETCH_ENABLED = os.getenv("WIKI_PREFETCH") == "1"
+# ~ EAGER_TOOLS=1 streams the tool-bound model call and starts each tool call as soon as its
+# ~ arguments are complete, while the model is still generating the next ones (see eager_tools.py).
+# ~ Opt-in: the tools (python_repl, web lookups) then run before the model has finished its answer
+EAGER_TOOLS_ENABLED = os.getenv("EAGER_TOOLS", "0") == "1"
+
+# ~ Per-turn budget for the chatbot <-> tools loop (see budget.py): a deadline for the whole turn,
+# ~ the last TURN_ANSWER_RESERVE_SECONDS of which are kept for the answer, and a cap on tool rounds
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "60"))
+TURN_MAX_TOOL_ROUNDS = int(os.getenv("TURN_MAX_TOOL_ROUNDS", "5"))
+TURN_ANSWER_RESERVE_SECONDS = float(os.getenv("TURN_ANSWER_RESERVE_SECONDS", "10"))
+
+
+def new_budget() -> TurnBudget:
+    return TurnBudget(TURN_DEADLINE_SECONDS, TURN_MAX_TOOL_ROUNDS, TURN_ANSWER_RESERVE_SECONDS)
+
+# ~ Conversation memory
+# ^ "bounded" keeps only the MAX_THREADS most recently used threads (LRU + idle TTL),
+# ^ "memory" is the plain InMemorySaver, which grows for as long as the process lives
+# ^ "sqlite" persists threads to CHECKPOINT_DB so they survive a restart
+CHECKPOINTER_MODE = os.getenv("CHECKPOINTER_MODE", "bounded")
+
+
+def build_serializer():
+    # ^ CHECKPOINT_COMPACT=1 stores messages as compact rows (see serde.py), CHECKPOINT_ZSTD=1 also compresses them
+    if os.getenv("CHECKPOINT_COMPACT", "1") != "1":
+        return None  # LangGraph's default serializer
+    return CompactSerializer(compress=os.getenv("CHECKPOINT_ZSTD") == "1")
+
+
+def build_checkpointer():
+    # ^ Called in each worker: the SQLite saver owns a connection and a flush thread, neither survives a fork
+    if CHECKPOINTER_MODE == "bounded":
+        return BoundedMemorySaver(
+            max_threads=int(os.getenv("MAX_THREADS", "1000")),
+            ttl_seconds=float(os.getenv("THREAD_TTL_SECONDS", "3600")),
+            # ^ Store each new version of the message list as a delta, in full every N versions (0 = always in full)
+            full_every=int(os.getenv("CHECKPOINT_FULL_EVERY", "8")),
+            keep_last=int(os.getenv("CHECKPOINT_KEEP_LAST", "5")),
+            serde=build_serializer(),
+        )
+    if CHECKPOINTER_MODE == "memory":
+        return InMemorySaver()
+    if CHECKPOINTER_MODE == "sqlite":
+        return SqliteSaver(
+            os.getenv("CHECKPOINT_DB", "checkpoints.sqlite"),
+            flush_interval=float(os.getenv("CHECKPOINT_FLUSH_SECONDS", "0.5")),
+            keep_last=int(os.getenv("CHECKPOINT_KEEP_LAST", "5")),
+            serde=build_serializer(),
+        )
+    raise ValueError(f"Unknown CHECKPOINTER_MODE: {CHECKPOINTER_MODE}")
+
+
+# ~ Python REPL
+# ^ Runs in a pool of sandboxed worker processes (per-call time, CPU and memory limits)
+# ^ so a heavy or endless snippet can't stall the other chats on this worker.
+# ^ Nothing is spawned until repl_pool.start() in the lifespan.
+repl_pool = ReplPool(
+    workers=int(os.getenv("REPL_WORKERS", "2")),
+    timeout=float(os.getenv("REPL_TIMEOUT_SECONDS", "10")),
+    cpu_seconds=int(os.getenv("REPL_CPU_SECONDS", "5")),
+    memory_mb=int(os.getenv("REPL_MEMORY_MB", "256")),
+    max_output_chars=int(os.getenv("REPL_MAX_OUTPUT_CHARS", "4000")),
+)
+repl_tool = Tool(
+    name="python_repl",
+    description="Execute python code using this shell. Use print(...) to display results",
+    func=repl_pool.run,
+    coroutine=repl_pool.arun,
+)
+
+
+# ~ Metrics (GET /metrics, Prometheus text format)
+metrics = Registry()
+node_seconds = metrics.histogram("graph_node_seconds", "Time spent in each graph node", ["node"])
+tool_seconds = metrics.histogram("tool_call_seconds", "Time per tool call, cache hits included", ["tool"])
+checkpoint_seconds = metrics.histogram(
+    "checkpointer_call_seconds",
+    "Time per checkpointer call",
+    ["op"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+first_byte_seconds = metrics.histogram(
+    "chat_first_byte_seconds", "Time from request to the first byte of the answer", ["endpoint"]
+)
+turn_seconds = metrics.histogram(
+    "chat_turn_seconds", "Time from the start of a graph run to its final answer, by route", ["route"]
+)
+llm_tokens = metrics.counter(
+    "llm_tokens_total", "Tokens sent to and generated by the chat models, by the node that called them", ["node", "direction"]
+)
+chat_errors = metrics.counter("chat_errors_total", "Graph runs that ended in an exception", ["endpoint"])
+client_disconnects = metrics.counter(
+    "chat_client_disconnects_total", "Clients that went away before the answer was sent", ["endpoint"]
+)
+runs_cancelled = metrics.counter(
+    "graph_runs_cancelled_total", "Graph runs stopped before the end, by the node that was cut short", ["node"]
+)
+turn_hops = metrics.histogram(
+    "chat_turn_hops", "Model calls and tool rounds per turn", ["kind"], buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10)
+)
+budget_exhausted = metrics.counter(
+    "chat_turn_budget_exhausted_total", "Turns answered early because their budget ran out", ["reason"]
+)
+
+
+metrics.gauge(
+    "wiki_prefetch_total",
+    "Speculative Wikipedia lookups by outcome (hit: the model asked for it, wasted: it didn't)",
+    lambda: {(outcome,): prefetcher.counters[outcome] for outcome in ("started", "hits", "wasted", "cancelled")}
+    if prefetcher
+    else {},
+    ["outcome"],
+    type="counter",
+)
+
+
+# ~ Admission control: global cap on concurrent runs, one run at a time per session, bounded queue
+admission = AdmissionController(
+    max_in_flight=int(os.getenv("MAX_IN_FLIGHT", "64")),
+    max_queue=int(os.getenv("MAX_QUEUE", "256")),
+    queue_timeout=float(os.getenv("QUEUE_TIMEOUT_SECONDS", "30")),
+    session_policy=os.getenv("SESSION_POLICY", "queue"),  # "queue" or "reject"
+)
+
+
+metrics.gauge("admission_in_flight", "Graph runs executing now", lambda: admission.in_flight)
+metrics.gauge("admission_queue_depth", "Requests waiting for a slot", lambda: admission.waiting)
+metrics.gauge(
+    "admission_rejected_total",
+    "Requests turned away with a 429, by reason",
+    lambda: {(reason,): admission.metrics[f"rejected_{reason}"] for reason in ("queue_full", "session_busy", "timeout")},
+    ["reason"],
+    type="counter",
+)
+
+
+async def admit(session_id: str):
+    try:
+        return await admission.acquire(session_id)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429, detail=e.reason, headers={"Retry-After": str(e.retry_after)}
+        ) from e
+
+
+class AdmittedResponse(StreamingResponse):
+    """A streamed answer that holds an admission ticket until the response is over.
+
+    This is the one place the ticket is released, and it runs however the response ends:
+    sent, body raised, or client gone (even before the body was started). A `finally` in the
+    body generator never runs if the body isn't started, and Starlette skips a background
+    task when the body raises.
+    """
+
+    def __init__(self, content, ticket=None, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.ticket:
+                admission.release(self.ticket)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global memory, graph
+    build_graph()  # no-op when it was preloaded
+    with startup_phase("checkpointer"):
+        memory = instrument_checkpointer(build_checkpointer(), checkpoint_seconds)
+        graph = compiled_graph.copy(update={"checkpointer": memory})
+    with startup_phase("tokenizer"):
+        # ^ May download the BPE file: done here so the first turn's history node doesn't block the loop on it
+        await asyncio.to_thread(load_encoding)
+    with startup_phase("repl_pool"):
+        # ~ Pre-warm the python_repl workers so the first computation doesn't pay for the spawn
+        repl_pool.start()
+    print("Startup phases (ms):", startup_phases)
+    yield
+    # ~ Flush any buffered checkpoint writes before the process exits
+    if isinstance(memory, SqliteSaver):
+        memory.close()
+    repl_pool.close()
+    await llm_clients.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # cors
 app.add_middleware(
@@ -30,6 +270,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Session-Id", "Retry-After"],
 )
 
 if not os.environ.get("OPENAI_API_KEY"):
@@ -41,67 +282,624 @@ api_key = os.getenv("OPENAI_API_KEY")
 # ~ Define chat request model
 class Chatbody(BaseModel):
     message: str
+    session_id: Optional[str] = None  # one LangGraph thread per session; a new one is started if omitted
 
 
 # ~ Define StateGraph
 class State(TypedDict):
     messages: Annotated[list, add_messages]
+    summary: str  # running summary of the turns that were dropped from `messages`
+
+
+# ~ Optional cache of final answers (RESPONSE_CACHE=1), matched exactly or by embedding similarity
+response_cache = (
+    ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "2048")),
+        threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95")),
+        ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600")),
+    )
+    if os.getenv("RESPONSE_CACHE") == "1"
+    else None
+)
 
 
-# ~ Build graph
-graph_builder = StateGraph(State)
+# ~ Prompts
+# ^ Compiled once here and looked up by name; SYSTEM_PROMPT_VERSION picks which registered
+# ^ wording of the system prompt is live.
+# ^ The system prompt is applied in front of the messages at model-call time; it is never written
+# ^ into the thread state. It is the same message object on every request, so every request
+# ^ sends the exact same bytes first, which is what the provider's prompt caching keys on.
+system_message = """
+       You are a helpful AI assistant.
+    - Use Wikipedia to answer factual questions.
+    - Use the Python REPL to execute computations and run short code snippets.
+    - Detect which tool (Wikipedia or python_repl) is needed and call it when appropriate.
+    - Prefer concise, professional answers; avoid unnecessary exposition.
+        """.strip()
+prompts = PromptRegistry()
+prompts.register("system", "v1", [("system", system_message)])
+prompts.register("summary", "v1", [("system", "Summary of the earlier conversation: {summary}")])
+prompts.register(
+    "fast_system",
+    "v1",
+    [("system", "You are a helpful AI assistant. Prefer concise, friendly, professional answers.")],
+)
+system_prompt = prompts.activate("system", os.getenv("SYSTEM_PROMPT_VERSION", "v1")).message()
+summary_prompt = prompts.get("summary")
+fast_system_prompt = prompts.get("fast_system").message()
+prompts.register(
+    "budget_exhausted",
+    "v1",
+    [
+        (
+            "system",
+            "You have used up the tool budget for this question. Do not call any more tools: answer now "
+            "with what you have, and say briefly what you could not check.",
+        )
+    ],
+)
+budget_exhausted_prompt = prompts.get("budget_exhausted").message()
+
+# ~ Prompt budget for the conversation history; older turns get folded into `summary`
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+
+
+@node_seconds.time(node="history")
+async def manage_history(state: State, config: RunnableConfig):
+    # ~ Threads from before the system prompt moved out of the state carry one copy per turn; drop them
+    stale = [RemoveMessage(id=m.id) for m in state["messages"] if m.type == "system"]
+    messages = [m for m in state["messages"] if m.type != "system"]
+
+    older, _ = split_history(messages, HISTORY_TOKEN_BUDGET)
+    if not older:
+        return {"messages": stale} if stale else {}
+    # ^ The summary is stored in the checkpoint, so each turn only summarizes what just fell out of the window
+    if (budget := config["configurable"].get("budget")) is not None:
+        budget.llm_calls += 1
+    response = await summarize(model, state.get("summary", ""), older)
+    count_usage(response, node="summarize")
+    return {
+        "summary": response.content,
+        "messages": stale + [RemoveMessage(id=message.id) for message in older],
+    }
+
+
+def count_usage(response, node: str) -> None:
+    if response.usage_metadata:
+        llm_tokens.inc(response.usage_metadata["input_tokens"], node=node, direction="input")
+        llm_tokens.inc(response.usage_metadata["output_tokens"], node=node, direction="output")
+
+
+def answered(config: RunnableConfig, route: str) -> None:
+    """Called by the node that produced the turn's final answer."""
+    started = config["configurable"].get("turn_started")
+    if started is not None:
+        turn_seconds.observe(time.perf_counter() - started, route=route)
+
+
+def prompt_for(state: State, system) -> list:
+    msgs = [system]
+    summary = state.get("summary")
+    if summary:
+        msgs.append(summary_prompt.message(summary=summary))
+    return msgs + state["messages"]
+
+
+# ~ Routing
+# ^ Decided from the user's message with local rules (router.py): greetings get a canned reply,
+# ^ small talk goes to the small model without tools, anything else to the tool-bound model
+route_turns = metrics.counter("router_turns_total", "Turns per route", ["route"])
+
+
+def route_turn(state: State) -> str:
+    messages = state["messages"]
+    previous = next((m.content for m in reversed(messages[:-1]) if m.type == "ai"), None)
+    route = router.classify(str(messages[-1].content), previous)
+    route_turns.inc(route=route)
+    return route
+
+
+@node_seconds.time(node="canned_reply")
+async def canned_reply(state: State, config: RunnableConfig):
+    answered(config, router.CANNED)
+    return {"messages": [AIMessage(content=router.canned_reply(str(state["messages"][-1].content)))]}
+
+
+@node_seconds.time(node="fast_reply")
+async def fast_reply(state: State, config: RunnableConfig):
+    msgs = prompt_for(state, fast_system_prompt)
+    if (budget := config["configurable"].get("budget")) is None:
+        response = await fast_model.ainvoke(msgs)
+    else:
+        budget.llm_calls += 1
+        try:
+            response = await asyncio.wait_for(fast_model.ainvoke(msgs), budget.remaining())
+        except TimeoutError:
+            budget.exhausted_by = DEADLINE
+            budget_exhausted.inc(reason=DEADLINE)
+            answered(config, router.FAST)
+            return {"messages": [AIMessage(content=out_of_time_text(state))]}
+    count_usage(response, node="fast_reply")
+    answered(config, router.FAST)
+    return {"messages": [response]}
+
+
+@node_seconds.time(node="chatbot")
+async def chatbot(state: State, config: RunnableConfig):
+    msgs = prompt_for(state, system_prompt)
+
+    # ^ Only the opening question of a thread is cacheable; follow-ups and tool loops always go to the model
+    question = cacheable_question(msgs) if response_cache and not state.get("summary") else None
+    if question is not None and (cached := response_cache.get(question)) is not None:
+        answered(config, router.FULL)
+        return {"messages": [AIMessage(content=cached)]}
+
+    budget = config["configurable"].get("budget")
+    if budget is not None and (reason := budget.exhausted()) is not None:
+        return {"messages": [await best_effort_answer(state, msgs, budget, reason, config)]}
+
+    # ^ Only the turn's first model call: after a tool result the next lookup can't be guessed from the question
+    prefetch_key = None
+    if prefetcher is not None and state["messages"][-1].type == "human":
+        prefetch_key = prefetcher.start(str(state["messages"][-1].content))
+
+    async def call_model():
+        # ~ ainvoke awaits the OpenAI call instead of holding a threadpool worker for the whole round trip
+        try:
+            if eager_tools is not None:
+                response = await eager_tools.ainvoke(
+                    llm_with_tools, msgs, run=config["configurable"]["thread_id"], budget=budget
+                )
+            else:
+                response = await llm_with_tools.ainvoke(msgs)
+        except BaseException:
+            if prefetch_key is not None:
+                prefetcher.settle(prefetch_key, [])
+            raise
+        if prefetch_key is not None:
+            prefetcher.settle(prefetch_key, response.tool_calls)
+        return response
+
+    if budget is None:
+        response = await call_model()
+    else:
+        budget.llm_calls += 1
+        try:
+            response = await asyncio.wait_for(call_model(), budget.remaining())
+        except TimeoutError:
+            budget.exhausted_by = DEADLINE
+            budget_exhausted.inc(reason=DEADLINE)
+            answered(config, router.FULL)
+            return {"messages": [AIMessage(content=out_of_time_text(state))]}
+    count_usage(response, node="chatbot")
+    if not response.tool_calls:
+        answered(config, router.FULL)
+        if question is not None:
+            response_cache.put(question, response.content)
+    return {"messages": [response]}
+
+
+def out_of_time_text(state: State) -> str:
+    """The answer when there is no time left for one more model call: whatever the tools found."""
+    found = []
+    for message in reversed(state["messages"]):
+        if message.type == "human":
+            break
+        if message.type == "tool" and message.status != "error":
+            found.append(str(message.content))
+    text = "Sorry, I ran out of time on this question before I could finish."
+    if found:
+        text += " Here is what I found so far:\n" + "\n".join(reversed(found))[:1000]
+    return text
+
+
+async def best_effort_answer(state: State, msgs: list, budget: TurnBudget, reason: str, config: RunnableConfig):
+    """The turn's final answer once its budget is spent: one last model call without tools, if time allows."""
+    budget.exhausted_by = reason
+    budget_exhausted.inc(reason=reason)
+    budget.llm_calls += 1
+    try:
+        response = await asyncio.wait_for(llm_final.ainvoke([*msgs, budget_exhausted_prompt]), budget.remaining())
+        count_usage(response, node="chatbot")
+        if response.tool_calls or not response.content:
+            # ^ Never hand the graph another tool call from here, it would go round the loop again
+            response = AIMessage(content=str(response.content) or out_of_time_text(state))
+    except TimeoutError:
+        response = AIMessage(content=out_of_time_text(state))
+    answered(config, router.FULL)
+    return response
+
+
+def build_graph():
+    """Build the model, the tools and the compiled graph, once per process (idempotent)."""
+    global llm_clients, model, llm_with_tools, llm_final, fast_model, wiki_cache, prefetcher, eager_tools, tools, compiled_graph
+    if compiled_graph is not None:
+        return compiled_graph
+
+    with startup_phase("model"):
+        # ~ One model and one connection pool for the whole process; per-request callbacks go in the
+        # ~ call's config, so no request ever builds a model (and a fresh TLS connection) of its own
+        llm_clients = OpenAIClients(
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "100")),
+            max_keepalive=int(os.getenv("OPENAI_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_SECONDS", "60")),
+            http2=os.getenv("OPENAI_HTTP2", "1") == "1",
+        )
+        model = llm_clients.chat_model(CHAT_MODEL)
+        fast_model = llm_clients.chat_model(FAST_MODEL) if ROUTER_ENABLED else None
+
+    #####
+    # * Define Tools
+    #####
+    with startup_phase("tools"):
+        from langchain_community.utilities import WikipediaAPIWrapper
+        from langchain_community.tools import WikipediaQueryRun
+
+        wiki_tool = WikipediaQueryRun(
+            api_wrapper=WikipediaAPIWrapper(top_k_results=1, doc_content_chars_max=200)
+        )
+        # ^ Same questions come up again and again, so answer repeats from a cache (WIKI_CACHE_DB also keeps it on disk)
+        wiki_cache = LookupCache(
+            wiki_tool.api_wrapper.run,
+            max_entries=int(os.getenv("WIKI_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("WIKI_CACHE_TTL_SECONDS", str(24 * 3600))),
+            negative_ttl_seconds=float(os.getenv("WIKI_CACHE_NEGATIVE_TTL_SECONDS", "600")),
+            path=os.getenv("WIKI_CACHE_DB"),
+        )
+        prefetcher = Prefetcher(wiki_cache, wiki_tool.name) if PREFETCH_ENABLED else None
+        wiki_tool = cached_tool(wiki_tool, prefetcher or wiki_cache)
+        tools = [instrument_tool(tool, tool_seconds) for tool in (wiki_tool, repl_tool)]
+        eager_tools = EagerToolExecutor(tools) if EAGER_TOOLS_ENABLED else None
+
+    with startup_phase("bind_tools"):
+        llm_with_tools = model.bind_tools(tools)
+        llm_final = model.bind_tools(tools, tool_choice="none")
+
+    with startup_phase("compile"):
+        from langgraph.prebuilt import ToolNode, tools_condition
+
+        # ~ Build graph
+        graph_builder = StateGraph(State)
+
+        #~ Add tools to the graph
+        tool_node = ToolNode(tools=tools)
+
+        @node_seconds.time(node="tools")
+        async def run_tools(state: State, config: RunnableConfig):
+            budget = config["configurable"].get("budget")
+            if budget is None:
+                return await execute_tools(state, config)
+
+            calls = state["messages"][-1].tool_calls
+            budget.tool_rounds += 1
+            budget.tool_calls += len(calls)
+            try:
+                return await asyncio.wait_for(execute_tools(state, config), budget.tool_time())
+            except TimeoutError:
+                # ^ The chatbot node sees the deadline next and answers with what the turn has
+                return {
+                    "messages": [
+                        ToolMessage(
+                            content="Stopped: the time budget for this question ran out.",
+                            name=call["name"],
+                            tool_call_id=call["id"],
+                            status="error",
+                        )
+                        for call in calls
+                    ]
+                }
+
+        async def execute_tools(state: State, config: RunnableConfig):
+            if eager_tools is None:
+                return await tool_node.ainvoke(state, config)
+
+            # ~ Calls the chatbot already started while streaming are awaited; only the rest run here
+            message = state["messages"][-1]
+            run = config["configurable"]["thread_id"]
+            early = {call["id"]: task for call in message.tool_calls if (task := eager_tools.take(run, call["id"]))}
+            late = [call for call in message.tool_calls if call["id"] not in early]
+            eager_tools.counters["late"] += len(late)
+
+            async def run_late():
+                if not late:
+                    return []
+                late_state = {**state, "messages": [*state["messages"][:-1], message.model_copy(update={"tool_calls": late})]}
+                return (await tool_node.ainvoke(late_state, config))["messages"]
+
+            late_results, *early_results = await asyncio.gather(run_late(), *early.values())
+            results = {m.tool_call_id: m for m in [*late_results, *early_results]}
+            return {"messages": [results[call["id"]] for call in message.tool_calls]}
+
+        graph_builder.add_node("tools", run_tools)
+
+        #~ Add nodes
+        # ^ define node with unique name
+        graph_builder.add_node("chatbot", chatbot)
+        graph_builder.add_node("history", manage_history)
+
+        #~ Add edges
+        # ^ Add entry point
+        graph_builder.add_edge(START, "history")
+        if ROUTER_ENABLED:
+            graph_builder.add_node("canned_reply", canned_reply)
+            graph_builder.add_node("fast_reply", fast_reply)
+            graph_builder.add_conditional_edges(
+                "history",
+                route_turn,
+                {router.FULL: "chatbot", router.FAST: "fast_reply", router.CANNED: "canned_reply"},
+            )
+            graph_builder.add_edge("canned_reply", END)
+            graph_builder.add_edge("fast_reply", END)
+        else:
+            graph_builder.add_edge("history", "chatbot")
+        graph_builder.add_edge("tools", "chatbot")
+        graph_builder.add_conditional_edges("chatbot", tools_condition)
+        # ^ Add exit point
+        graph_builder.add_edge("chatbot", END)
+        # ^ Compile graph (the checkpointer is attached per process in the lifespan)
+        compiled_graph = graph_builder.compile()
+
+    return compiled_graph
+
+
+startup_phases["imports"] = round((time.perf_counter() - _import_started) * 1000, 1)
+
+if os.getenv("PRELOAD_GRAPH") == "1":
+    build_graph()
 
-model = init_chat_model(model="gpt-4o-mini", model_provider="openai")
 
-#####
-# * Define Tools
-#####
-wiki_tool = WikipediaQueryRun(
-    api_wrapper=WikipediaAPIWrapper(top_k_results=1, doc_content_chars_max=200)
-)
+######
+# * GET /
+######
+@app.get("/")
+async def get_home():
+    return {"success": True, "message": "Fast API x LangGraph backend"}
 
-# ~ Python REPL
-python_repl = PythonREPL()
-repl_tool = Tool(
-    name="python_repl",
-    description="Execute python code using this shell. Use print(...) to display results",
-    func=python_repl.run,
-)
 
-tools = [wiki_tool, repl_tool]
+######
+# * GET /startup
+######
+@app.get("/startup")
+async def get_startup():
+    return {
+        "success": True,
+        "preloaded": os.getenv("PRELOAD_GRAPH") == "1",
+        "phases_ms": startup_phases,
+        "upstream": llm_clients.stats() if llm_clients else None,
+        "prompts": prompts.describe(),
+    }
+
 
-llm_with_tools = model.bind_tools(tools)
+######
+# * GET /sessions/stats
+######
+@app.get("/sessions/stats")
+async def get_session_stats():
+    if isinstance(memory, BoundedMemorySaver):
+        return {"success": True, "mode": CHECKPOINTER_MODE, **memory.stats()}
+    if isinstance(memory, SqliteSaver):
+        return {"success": True, "mode": CHECKPOINTER_MODE, "path": memory.path, "flushes": memory.flushes}
+    return {"success": True, "mode": CHECKPOINTER_MODE, "threads": len(memory.storage)}
 
 
-def chatbot(state: State):
-    return {"messages": [llm_with_tools.invoke(state["messages"])]}
+######
+# * GET /cache/stats
+######
+@app.get("/cache/stats")
+async def get_cache_stats():
+    if response_cache is None:
+        return {"success": True, "enabled": False}
+    return {"success": True, "enabled": True, **response_cache.stats()}
 
-#~ Add tools to the graph
-graph_builder.add_node("tools", ToolNode(tools=[wiki_tool, repl_tool]))
 
-#~ Add nodes
-# ^ define node with unique name
-graph_builder.add_node("chatbot", chatbot)
+######
+# * GET /admission/stats
+######
+@app.get("/admission/stats")
+async def get_admission_stats():
+    return {"success": True, **admission.stats()}
 
-#~ Add edges
-# ^ Add entry point
-graph_builder.add_edge(START, "chatbot")
-graph_builder.add_edge("tools", "chatbot")
-graph_builder.add_conditional_edges("chatbot", tools_condition)
-# ^ Add exit point
-graph_builder.add_edge("chatbot", END)
-# ^ Compile graph
-graph = graph_builder.compile(checkpointer=memory)
 
-config = {"configurable": {"thread_id": "1"}}
+######
+# * GET /metrics
+######
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 ######
-# * GET /
+# * GET /tools/stats
 ######
-@app.get("/")
-async def get_home():
-    return {"success": True, "message": "Fast API x LangGraph backend"}
+@app.get("/tools/stats")
+async def get_tool_stats():
+    return {
+        "success": True,
+        "python_repl": repl_pool.stats(),
+        "wikipedia": wiki_cache.stats(),
+        "prefetch": prefetcher.stats() if prefetcher else {"enabled": False},
+        "eager": eager_tools.stats() if eager_tools else {"enabled": False},
+    }
+
+
+######
+# * GET /router/stats
+######
+@app.get("/router/stats")
+async def get_router_stats():
+    if not ROUTER_ENABLED:
+        return {"success": True, "enabled": False}
+    routes = {}
+    for (route,), (count, total) in turn_seconds.totals().items():
+        routes[route] = {"turns": count, "avg_ms": round(total / count * 1000, 1) if count else 0.0}
+    return {"success": True, "enabled": True, "fast_model": FAST_MODEL, "routes": routes}
+
+
+_END_OF_RUN = object()
+
+
+async def run_turn(message: str, session_id: str, stream_mode: str, budget: Optional[TurnBudget] = None):
+    """graph.astream for one turn, stopped for good if its consumer goes away.
+
+    When the client disconnects, the response task is cancelled (or this generator closed),
+    and the run is cancelled with it: the nodes in progress stop, which aborts the OpenAI
+    request and the running tools (python_repl kills its worker). What the thread
+    checkpointed so far is kept, with any tool calls left open answered as cancelled, so the
+    next turn of the session starts from a valid conversation.
+
+    The nodes enforce `budget` (a fresh default one if none is given) and record the hops in it.
+    """
+    budget = budget or new_budget()
+    # ~ The graph runs in a task of its own so it gets exactly one cancellation. Starlette's cancel
+    # ~ scope keeps re-cancelling the response task, which stops LangGraph halfway through
+    # ~ cancelling its nodes and leaves the model call running.
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def run():
+        try:
+            async for event in graph.astream(
+                {"messages": [HumanMessage(content=message)]},
+                {"configurable": {"thread_id": session_id, "turn_started": budget.started, "budget": budget}},
+                stream_mode=stream_mode,
+            ):
+                events.put_nowait(event)
+        finally:
+            if eager_tools is not None:
+                # ^ Calls started by a chatbot node whose tools node never ran (the run failed or was cancelled)
+                eager_tools.discard_run(session_id)
+            budget.finish()
+            turn_hops.observe(budget.llm_calls, kind="llm")
+            turn_hops.observe(budget.tool_rounds, kind="tool_round")
+            events.put_nowait(_END_OF_RUN)
+
+    task = asyncio.create_task(run())
+    try:
+        while (event := await events.get()) is not _END_OF_RUN:
+            yield event
+        await task  # raises what the run raised
+    except (asyncio.CancelledError, GeneratorExit):
+        task.cancel()
+        # ^ Shielded: the cancellation that got us here must not cut the cleanup short as well
+        await asyncio.shield(asyncio.ensure_future(close_cancelled_turn(task, session_id)))
+        raise
+
+
+async def close_cancelled_turn(task: asyncio.Task, session_id: str) -> None:
+    await asyncio.wait([task])
+    config = {"configurable": {"thread_id": session_id}}
+    state = await graph.aget_state(config)
+    runs_cancelled.inc(node=state.next[0] if state.next else "none")
+
+    messages = state.values.get("messages", [])
+    if not messages or messages[-1].type != "ai" or not messages[-1].tool_calls:
+        return
+    open_calls = messages[-1].tool_calls
+    # ^ The model API rejects a conversation with tool calls that never got a result
+    await graph.aupdate_state(
+        config,
+        {
+            "messages": [
+                ToolMessage(
+                    content="Cancelled: the client disconnected before this tool call finished.",
+                    name=call["name"],
+                    tool_call_id=call["id"],
+                    status="error",
+                )
+                for call in open_calls
+            ]
+        },
+        as_node="tools",
+    )
+
+
+async def answer_lines(message: str, session_id: str, budget: Optional[TurnBudget] = None):
+    """The AI messages of one graph run, one line each (the /chat body)."""
+    async for event in run_turn(message, session_id, "values", budget):
+        response = event["messages"][-1]
+        if response.type == "ai":
+            yield response.content + "\n" #~ YIELD- When the function ends, you don't want to exit the function, instead, you want to continue calling the function to generate the next chunk of data(for streaming)
+
+
+ANSWER_NODES = ("chatbot", "fast_reply", "canned_reply")
+
+
+async def answer_tokens(message: str, session_id: str, budget: Optional[TurnBudget] = None):
+    """The answer's tokens of one graph run, as the model produces them (the /chat/stream body)."""
+    # ~ "messages" mode yields (message_chunk, metadata) for every token the LLM produces
+    async for chunk, metadata in run_turn(message, session_id, "messages", budget):
+        # Only forward what the answering nodes generate, not tool output or the history summary
+        if metadata.get("langgraph_node") not in ANSWER_NODES or not chunk.content:
+            continue
+        yield chunk.content
+
+
+# ~ Single-flight: identical questions asked at the same time without a session share one graph run
+single_flight = SingleFlight() if os.getenv("SINGLE_FLIGHT", "1") == "1" else None
+if single_flight is not None:
+    metrics.gauge(
+        "single_flight_requests_total",
+        "Stateless requests that ran the graph (leader) or shared another run (follower)",
+        lambda: {(role,): single_flight.counters[role + "s"] for role in ("leader", "follower")},
+        ["role"],
+        type="counter",
+    )
+
+
+def follow(flight, session_id: str):
+    # ^ Subscribed now, not when the response starts reading: until then the leader's client
+    # ^ leaving would cancel a run this request is waiting on
+    chunks = single_flight.follow(flight)
+
+    async def relay():
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                yield chunk
+        # ^ Give the follower its own copy of the conversation, so the session can carry on from here
+        if flight.result is not None:
+            await graph.aupdate_state(
+                {"configurable": {"thread_id": session_id}}, flight.result.values, as_node="chatbot"
+            )
+
+    return relay()
+
+
+async def start_run(request: Chatbody, session_id: str, answer, budget: TurnBudget):
+    """Admit the request and return (chunks, ticket to release once they have been sent).
+
+    A request without a session has no history, so its answer depends only on the question:
+    if the same question is already being answered, it subscribes to that run instead of
+    starting its own (and `budget` goes unused). The run's ticket is then released by the run itself.
+    """
+    if request.session_id is not None or single_flight is None:
+        ticket = await admit(session_id)
+        return answer(request.message, session_id, budget), ticket
+
+    key = (answer.__name__, CHAT_MODEL, FAST_MODEL if ROUTER_ENABLED else None, normalize_text(request.message))
+    if (flight := single_flight.get(key)) is not None:
+        return follow(flight, session_id), None
+    ticket = await admit(session_id)
+    # ^ Another request may have started the same run while this one waited for a slot
+    if (flight := single_flight.get(key)) is not None:
+        admission.release(ticket)
+        return follow(flight, session_id), None
+    config = {"configurable": {"thread_id": session_id}}
+    flight = single_flight.lead(
+        key,
+        answer(request.message, session_id, budget),
+        result=lambda: graph.aget_state(config),
+        on_done=lambda: admission.release(ticket),
+    )
+    return flight.subscribe(), None
+
+
+#####
+# * GET /single-flight/stats
+#####
+@app.get("/single-flight/stats")
+async def get_single_flight_stats():
+    if single_flight is None:
+        return {"success": True, "enabled": False}
+    return {"success": True, "enabled": True, **single_flight.stats()}
 
 
 #####
@@ -109,30 +907,32 @@ async def get_home():
 #####
 @app.post("/chat")
 async def chat_endpoint(request: Chatbody):
-    try:
-        question = request.message
-
-        system_message = """
-       You are a helpful AI assistant.
-    - Use Wikipedia to answer factual questions.
-    - Use the Python REPL to execute computations and run short code snippets.
-    - Detect which tool (Wikipedia or python_repl) is needed and call it when appropriate.
-    - Prefer concise, professional answers; avoid unnecessary exposition.
-        """.strip()
-
-        events = graph.stream(
-            {"messages": [("user", question), ("system", system_message)]},
-            config,
-            stream_mode="values",
-        )
-
-        def generate_response():
-            for event in events:
-                response = event["messages"][-1]
-                if response.type == "ai":
-                    yield response.content + "\n" #~ YIELD- When the function ends, you don't want to exit the function, instead, you want to continue calling the function to generate the next chunk of data(for streaming)
-        
-        return StreamingResponse(generate_response(), media_type="text/plain")
+    started = time.perf_counter()
+    session_id = request.session_id or uuid.uuid4().hex
+    # ^ The turn's deadline counts from here, time spent waiting for admission included
+    lines, ticket = await start_run(request, session_id, answer_lines, new_budget())
+
+    async def generate_response():
+        first_byte = True
+        try:
+            # ^ aclosing: if the client goes away mid-answer, the run behind `lines` is stopped right away
+            async with aclosing(lines):
+                async for line in lines:
+                    if first_byte:
+                        first_byte_seconds.observe(time.perf_counter() - started, endpoint="chat")
+                        first_byte = False
+                    yield line
+        except (asyncio.CancelledError, GeneratorExit):
+            client_disconnects.inc(endpoint="chat")
+            raise
+        except Exception:
+            chat_errors.inc(endpoint="chat")
+            raise
+
+    # ^ The slot is held until the response is over (see AdmittedResponse)
+    return AdmittedResponse(
+        generate_response(), ticket, media_type="text/plain", headers={"X-Session-Id": session_id}
+    )
 
     #! WE WANT TO STREAM THE RESPONSE INSTEAD OF RETURNING THE WHOLE OF IT AT ONCE
     #         response = ""
@@ -141,5 +941,55 @@ async def chat_endpoint(request: Chatbody):
     #             response = event["messages"][-1].content
     #         return {"response": response}
 
-    except Exception as e:
-        print("An exception occurred: ", e)
+
+#####
+# * POST /chat/stream
+#####
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: Chatbody):
+    """Stream the answer token by token as Server-Sent Events.
+
+    Every token is sent as `data: <json string>` (JSON so newlines in a token can't break the
+    SSE framing), followed by one `event: metrics` with the time to first token and the
+    turn's hops, and a final `data: [END]`.
+    """
+    started = time.perf_counter()
+    session_id = request.session_id or uuid.uuid4().hex
+    budget = new_budget()
+    tokens_in, ticket = await start_run(request, session_id, answer_tokens, budget)
+
+    async def generate_tokens():
+        first_token_at = None
+        tokens = 0
+        try:
+            async with aclosing(tokens_in):
+                async for token in tokens_in:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        first_byte_seconds.observe(first_token_at - started, endpoint="chat_stream")
+                    tokens += 1
+                    yield f"data: {json.dumps(token)}\n\n"
+        except (asyncio.CancelledError, GeneratorExit):
+            client_disconnects.inc(endpoint="chat_stream")
+            raise
+        except Exception as e:
+            logger.exception("/chat/stream run failed")
+            chat_errors.inc(endpoint="chat_stream")
+            yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+
+        turn_metrics = {
+            "ttft_ms": round((first_token_at - started) * 1000, 1) if first_token_at else None,
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            "tokens": tokens,
+            # ^ Model calls and tool rounds the turn used (null when the answer came from another request's run)
+            "hops": budget.usage() if budget.finished else None,
+        }
+        yield f"event: metrics\ndata: {json.dumps(turn_metrics)}\n\n"
+        yield "data: [END]\n\n"
+
+    return AdmittedResponse(
+        generate_tokens(),
+        ticket,
+        media_type="text/event-stream",
+        headers={"X-Session-Id": session_id, "Cache-Control": "no-cache"},
+    )
@@ -0,0 +1,180 @@
+"""In-process metrics, exposed in the Prometheus text format at GET /metrics.
+
+Kept dependency-free and cheap enough to leave on in production: an observation is a
+bisect over a fixed bucket list and a couple of additions under a lock.
+"""
+
+import bisect
+import functools
+import inspect
+import threading
+import time
+from typing import Callable, Iterable
+
+# ~ Seconds; spans a cache hit (~1ms) to a slow tool loop (~1min)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels[n] for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_label_str(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (+Inf last), sum]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels[n] for n in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels):
+        """Decorator timing a sync or async function into this histogram."""
+
+        def decorate(fn: Callable):
+            if inspect.iscoroutinefunction(fn):
+
+                @functools.wraps(fn)
+                async def async_timed(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        self.observe(time.perf_counter() - started, **labels)
+
+                return async_timed
+
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, **labels)
+
+            return timed
+
+        return decorate
+
+    def totals(self) -> dict[tuple, tuple[int, float]]:
+        """{label values: (count, sum)} for every series."""
+        with self._lock:
+            return {key: (sum(counts), total) for key, (counts, total) in self._series.items()}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                labels = _label_str(self.labels + ("le",), key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_str(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Read at scrape time from `fn`, which returns {label values tuple: value} or a number.
+
+    `type="counter"` exposes a running total that is already kept elsewhere.
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable, labels: Iterable[str] = (), type: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labels = tuple(labels)
+        self.type = type
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        values = self.fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            if value is not None:
+                lines.append(f"{self.name}{_label_str(self.labels, key)} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, fn: Callable, labels: Iterable[str] = (), type: str = "gauge") -> Gauge:
+        return self._add(Gauge(name, help, fn, labels, type))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+def instrument_tool(tool, histogram: Histogram):
+    """Time every call of `tool` (sync or async) under `tool=<its name>`."""
+    if tool.func is not None:
+        tool.func = histogram.time(tool=tool.name)(tool.func)
+    if tool.coroutine is not None:
+        tool.coroutine = histogram.time(tool=tool.name)(tool.coroutine)
+    return tool
+
+
+def instrument_checkpointer(saver, histogram: Histogram):
+    """Time the async checkpointer calls the graph makes (`op` = get, put, put_writes)."""
+    for op, attr in (("get", "aget_tuple"), ("put", "aput"), ("put_writes", "aput_writes")):
+        setattr(saver, attr, histogram.time(op=op)(getattr(saver, attr)))
+    return saver
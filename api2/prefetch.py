@@ -0,0 +1,157 @@
+"""Speculative Wikipedia prefetch, started alongside the first model call of a turn.
+
+For a factual question the model's first round trip almost always ends in a Wikipedia
+lookup, and only then does the lookup start. `Prefetcher.start` guesses the lookup from the
+user's message with local rules (`guess_query`) and runs it while the model is thinking.
+Once the model has answered, `settle` checks whether it asked for the same lookup:
+
+- hit:   the wikipedia tool call is served from the prefetch (awaited if still running)
+- waste: the model asked for something else or nothing; the prefetch is cancelled
+
+A prefetch that finished still lands in the LookupCache, so even a late "waste" isn't lost.
+"""
+
+import asyncio
+import re
+import time
+from typing import Optional
+
+from tool_cache import LookupCache, normalize_query
+
+# ~ Questions about a thing, a person, a place: "who was Ada Lovelace", "tell me about Rust"
+_FACTUAL = re.compile(
+    r"^(?:(?:who|what|where|when)\s+(?:is|was|are|were)|what's|who's|tell me about|"
+    r"what do you know about|(?:give me|i want) (?:some )?(?:info|information) (?:on|about))\s+"
+    r"(?P<subject>.+?)[\s?!.]*$",
+    re.IGNORECASE,
+)
+# ~ "what is the capital of France" -> "France"
+_OF = re.compile(r"^(?:the\s+)?(?:capital|population|history|president|currency|language)\s+of\s+(?P<subject>.+)$", re.IGNORECASE)
+# ~ Computations and code go to python_repl, not Wikipedia
+_NOT_A_LOOKUP = re.compile(r"\d|[+\-*/^=%]|\b(calculate|compute|solve|python|code|run|execute|script|function)\b", re.IGNORECASE)
+
+
+def guess_query(text: str) -> Optional[str]:
+    """The Wikipedia query the model will most likely make for `text`, or None if it won't make one."""
+    text = text.strip()
+    if len(text.split()) > 15 or _NOT_A_LOOKUP.search(text):
+        return None
+    match = _FACTUAL.match(text)
+    if match is None:
+        return None
+    subject = match.group("subject")
+    if (of := _OF.match(subject)) is not None:
+        subject = of.group("subject")
+    subject = re.sub(r"^(?:the|a|an)\s+", "", subject, flags=re.IGNORECASE)
+    return subject or None
+
+
+def _key(query: str) -> str:
+    return re.sub(r"^(?:the|a|an)\s+", "", normalize_query(query))
+
+
+class _Prefetch:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.started = time.monotonic()
+        self.owners = 1  # turns that started it and haven't settled yet
+        self.pending = 0  # settled as hits, tool call not made yet
+        self.early = 0  # tool calls made before their turn settled (the tool started while the model streamed)
+
+
+class Prefetcher:
+    """Runs guessed lookups through `cache` ahead of the model and serves them to the tool.
+
+    Pass it to `cached_tool` in place of the cache: `lookup`/`alookup` answer from a matching
+    prefetch when there is one and fall back to the cache otherwise. A prefetch nobody
+    claims within `max_age` seconds is dropped.
+    """
+
+    def __init__(self, cache: LookupCache, tool_name: str = "wikipedia", *, max_age: float = 60):
+        self.cache = cache
+        self.tool_name = tool_name
+        self.max_age = max_age
+        self._prefetches: dict[str, _Prefetch] = {}
+        self.counters = {"skipped": 0, "started": 0, "joined": 0, "hits": 0, "wasted": 0, "cancelled": 0}
+
+    # ~ Called by the chatbot node
+    def start(self, text: str) -> Optional[str]:
+        """Start the lookup `text` probably needs; returns the key to `settle` later (None if no guess)."""
+        self._drop_stale()
+        query = guess_query(text)
+        if query is None:
+            self.counters["skipped"] += 1
+            return None
+        key = _key(query)
+        if (prefetch := self._prefetches.get(key)) is not None:
+            prefetch.owners += 1
+            self.counters["joined"] += 1
+        else:
+            self._prefetches[key] = _Prefetch(asyncio.create_task(self.cache.alookup(query)))
+            self.counters["started"] += 1
+        return key
+
+    def settle(self, key: Optional[str], tool_calls: list) -> None:
+        """Once the model has answered: keep the prefetch if it asked for that lookup, else let it go."""
+        if key is None or (prefetch := self._prefetches.get(key)) is None:
+            return
+        prefetch.owners -= 1
+        asked = any(
+            call["name"] == self.tool_name and _key(str(call["args"].get("query", ""))) == key
+            for call in tool_calls
+        )
+        if asked:
+            if prefetch.early > 0:
+                prefetch.early -= 1  # its tool call already came and went
+            else:
+                prefetch.pending += 1
+            self.counters["hits"] += 1
+        else:
+            self.counters["wasted"] += 1
+        self._release(key, prefetch)
+
+    def _release(self, key: str, prefetch: _Prefetch) -> None:
+        if prefetch.owners > 0 or prefetch.pending > 0:
+            return
+        del self._prefetches[key]
+        if not prefetch.task.done():
+            prefetch.task.cancel()
+            self.counters["cancelled"] += 1
+
+    def _drop_stale(self) -> None:
+        now = time.monotonic()
+        for key, prefetch in list(self._prefetches.items()):
+            if now - prefetch.started > self.max_age:
+                prefetch.owners = prefetch.pending = 0
+                self._release(key, prefetch)
+
+    # ~ Called by the wikipedia tool
+    async def alookup(self, query: str) -> str:
+        key = _key(query)
+        if (prefetch := self._prefetches.get(key)) is None:
+            return await self.cache.alookup(query)
+        try:
+            # ^ shield: a cancelled tool call mustn't cancel a lookup other turns may be waiting on
+            return await asyncio.shield(prefetch.task)
+        except asyncio.CancelledError:
+            if not prefetch.task.cancelled():
+                raise  # this tool call itself was cancelled
+            return await self.cache.alookup(query)  # the prefetch was dropped under us
+        finally:
+            if prefetch.pending > 0:
+                prefetch.pending -= 1
+                self._release(key, prefetch)
+            elif prefetch.owners > 0:
+                prefetch.early += 1
+
+    def lookup(self, query: str) -> str:
+        return self.cache.lookup(query)
+
+    def stats(self) -> dict:
+        settled = self.counters["hits"] + self.counters["wasted"]
+        return {
+            "in_flight": len(self._prefetches),
+            **self.counters,
+            "hit_ratio": round(self.counters["hits"] / settled, 3) if settled else 0.0,
+            "waste_ratio": round(self.counters["wasted"] / settled, 3) if settled else 0.0,
+        }
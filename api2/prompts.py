@@ -0,0 +1,76 @@
+"""Prompt registry: every prompt is compiled once, at startup, and looked up by name and version.
+
+Messages without variables (system prompts) are rendered once and the same message
+object is reused on every request. Only the parts that take variables are formatted
+per call, straight through their message template, skipping the full
+ChatPromptTemplate.invoke machinery (validation, callbacks, a PromptValue).
+"""
+
+from typing import Optional
+
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+
+class Prompt:
+    def __init__(self, name: str, version: str, messages: list):
+        self.name = name
+        self.version = version
+        self.template = ChatPromptTemplate(messages)
+        self.input_variables = set(self.template.input_variables)
+        # One entry per message: the rendered message if it is static, else its template
+        self._parts: list = []
+        for part in self.template.messages:
+            if getattr(part, "input_variables", None) == []:
+                self._parts.append(part.format())
+            else:
+                self._parts.append(part)
+
+    def messages(self, **variables) -> list[BaseMessage]:
+        missing = self.input_variables - variables.keys()
+        if missing:
+            raise KeyError(f"Prompt {self.name}@{self.version} is missing {sorted(missing)}")
+        return [part if isinstance(part, BaseMessage) else part.format(**variables) for part in self._parts]
+
+    def message(self, **variables) -> BaseMessage:
+        """For single-message prompts, e.g. a system prompt."""
+        (message,) = self.messages(**variables)
+        return message
+
+
+class PromptRegistry:
+    """Prompts by name, each with any number of versions and one active version.
+
+    The first version registered for a name is active until another one is activated,
+    so a new wording can be registered next to the old one and switched on by config.
+    """
+
+    def __init__(self):
+        self._prompts: dict[str, dict[str, Prompt]] = {}
+        self._active: dict[str, str] = {}
+
+    def register(self, name: str, version: str, messages: list) -> Prompt:
+        prompt = Prompt(name, version, messages)
+        self._prompts.setdefault(name, {})[version] = prompt
+        self._active.setdefault(name, version)
+        return prompt
+
+    def activate(self, name: str, version: str) -> Prompt:
+        prompt = self.get(name, version)
+        self._active[name] = version
+        return prompt
+
+    def get(self, name: str, version: Optional[str] = None) -> Prompt:
+        versions = self._prompts.get(name)
+        if not versions:
+            raise KeyError(f"Unknown prompt: {name}")
+        version = version or self._active[name]
+        if version not in versions:
+            raise KeyError(f"Unknown version {version} of prompt {name}, have {sorted(versions)}")
+        return versions[version]
+
+    def describe(self) -> dict:
+        return {
+            name: {"active": self._active[name], "versions": sorted(versions)}
+            for name, versions in self._prompts.items()
+        }
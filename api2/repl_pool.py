@@ -0,0 +1,249 @@
+"""A sandboxed, pre-warmed process pool that backs the python_repl tool.
+
+Code from the model runs in separate worker processes, so a CPU-heavy snippet can't hold the
+API's GIL, and a runaway one is killed without taking the server down with it.
+This module only imports the standard library, so spawning a worker stays cheap.
+"""
+
+import asyncio
+import io
+import multiprocessing
+import queue
+import re
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
+
+try:
+    import resource  # ~ POSIX only; without it we still have the wall-clock timeout
+except ImportError:
+    resource = None
+
+
+class _CappedStringIO(io.StringIO):
+    """stdout replacement that silently drops everything past `limit` characters."""
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+        self.truncated = False
+
+    def write(self, s: str) -> int:
+        room = self.limit - self.tell()
+        if room <= 0:
+            self.truncated = True
+            return len(s)
+        if len(s) > room:
+            self.truncated = True
+        super().write(s[:room])
+        return len(s)
+
+
+def _worker_main(conn, memory_mb: int) -> None:
+    """Loop inside a worker process: receive code, run it, send back what it printed."""
+    if resource and memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    while True:
+        try:
+            code, cpu_seconds, max_output_chars = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+
+        if resource and cpu_seconds:
+            # ^ RLIMIT_CPU counts the whole process lifetime, so move the soft limit past what we've used so far
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+            soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+            if hard != resource.RLIM_INFINITY:
+                soft = min(soft, hard)
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+        out = _CappedStringIO(max_output_chars)
+        try:
+            with redirect_stdout(out), redirect_stderr(out):
+                exec(code, {"__name__": "__main__"})  # fresh globals, nothing leaks between chats
+            result = out.getvalue()
+        except BaseException as e:  # noqa: BLE001 - report anything the snippet raised, like PythonREPL does
+            result = out.getvalue() + repr(e)
+        if out.truncated:
+            result += f"\n...[output truncated at {max_output_chars} characters]"
+        conn.send(result)
+
+
+class _Call:
+    """One python_repl call, so arun can kill the worker running it if the caller goes away."""
+
+    __slots__ = ("lock", "process", "cancelled")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.process = None  # set while a worker is executing the code
+        self.cancelled = False
+
+
+class ReplPool:
+    """Runs python_repl snippets in a fixed pool of pre-spawned worker processes.
+
+    Each call gets a wall-clock `timeout`, a `cpu_seconds` CPU budget and an address-space cap
+    of `memory_mb`; a worker that blows any of them is killed and replaced. Output is capped at
+    `max_output_chars`.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        *,
+        timeout: float = 10,
+        cpu_seconds: int = 5,
+        memory_mb: int = 256,
+        max_output_chars: int = 4000,
+    ):
+        self.size = workers
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_output_chars = max_output_chars
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: queue.Queue = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._started = False
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            "calls": 0,
+            "timeouts": 0,
+            "killed": 0,  # hit the CPU or memory limit (or crashed)
+            "rejected": 0,  # no free worker within `timeout`
+            "cancelled": 0,  # the caller went away mid-run; the worker was killed
+            "respawned": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+        }
+
+    # ~ Lifecycle
+    def start(self) -> None:
+        """Spawn the workers up front so the first tool call doesn't pay for it."""
+        with self._start_lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._idle.put(self._spawn())
+            self._started = True
+
+    def close(self) -> None:
+        with self._start_lock:
+            while True:
+                try:
+                    process, conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                process.kill()
+            self._started = False
+
+    def _spawn(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main, args=(child_conn, self.memory_mb), daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+
+    def _replace(self, worker):
+        process, conn = worker
+        conn.close()
+        process.kill()
+        process.join()
+        self._record("respawned")
+        return self._spawn()
+
+    # ~ Execution
+    @staticmethod
+    def sanitize_input(query: str) -> str:
+        """Strip whitespace and ```python fences around the snippet (same rules as PythonREPL)."""
+        query = re.sub(r"^(\s|`)*(?i:python)?\s*", "", query)
+        return re.sub(r"(\s|`)*$", "", query)
+
+    def run(self, code: str) -> str:
+        return self._execute(code, _Call())
+
+    def _execute(self, code: str, call: _Call) -> str:
+        self.start()
+        started = time.perf_counter()
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            self._record("rejected")
+            return "Error: all python_repl workers are busy, try again later."
+
+        try:
+            process, conn = worker
+            with call.lock:
+                if call.cancelled:
+                    return "Error: execution was cancelled"
+                call.process = process
+            conn.send((self.sanitize_input(code), self.cpu_seconds, self.max_output_chars))
+            if conn.poll(self.timeout):
+                output = conn.recv()
+            else:
+                self._record("timeouts")
+                worker = self._replace(worker)
+                output = f"TimeoutError: execution took longer than {self.timeout} seconds"
+        except (EOFError, OSError):
+            if call.cancelled:
+                self._record("cancelled")
+                output = "Error: execution was cancelled"
+            else:
+                # ^ The worker died: SIGXCPU from the CPU limit, MemoryError in the interpreter itself, segfault...
+                self._record("killed")
+                output = "Error: execution was killed (CPU or memory limit exceeded)"
+            worker = self._replace(worker)
+        finally:
+            with call.lock:
+                call.process = None  # from here on the worker is someone else's
+            self._idle.put(worker)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._metrics_lock:
+            self.metrics["calls"] += 1
+            self.metrics["total_ms"] += elapsed_ms
+            self.metrics["max_ms"] = max(self.metrics["max_ms"], elapsed_ms)
+        return output
+
+    async def arun(self, code: str) -> str:
+        # ~ The thread only waits on a pipe, the actual work happens in the worker process
+        call = _Call()
+        execution = asyncio.ensure_future(asyncio.to_thread(self._execute, code, call))
+        try:
+            return await asyncio.shield(execution)
+        except asyncio.CancelledError:
+            # ^ Cancelling the await alone would leave the snippet running to its timeout
+            self.cancel(call)
+            raise
+
+    @staticmethod
+    def cancel(call: _Call) -> None:
+        """Stop `call`: kill its worker if it is running (the pool respawns it), else don't start it."""
+        with call.lock:
+            call.cancelled = True
+            if call.process is not None:
+                call.process.kill()
+
+    def _record(self, key: str) -> None:
+        with self._metrics_lock:
+            self.metrics[key] += 1
+
+    def stats(self) -> dict:
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+        calls = metrics.pop("calls")
+        total_ms = metrics.pop("total_ms")
+        return {
+            "workers": self.size,
+            "idle": self._idle.qsize(),
+            "calls": calls,
+            "avg_ms": round(total_ms / calls, 1) if calls else 0.0,
+            **metrics,
+        }
@@ -0,0 +1,168 @@
+"""Response cache in front of the chatbot node: exact match first, then embedding similarity."""
+
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+# ~ Words that change the answer while barely moving a question's embedding
+_NUMBER_WORDS = (
+    "zero one two three four five six seven eight nine ten eleven twelve hundred thousand million billion "
+    "first second third fourth fifth sixth seventh eighth ninth tenth last"
+).split()
+_NEGATIONS = "not no never none nothing nobody nor without cannot".split()
+_GUARD = re.compile(
+    r"\d[\w.]*|\b(?:" + "|".join(_NUMBER_WORDS + _NEGATIONS) + r")\b|n't\b",
+)
+
+
+def guard_tokens(text: str) -> tuple:
+    """The numbers, ordinals and negations in `text`, in order.
+
+    "who was the first president" and "who was the 41st president", or "is it safe to ..."
+    and "is it not safe to ...", are near neighbours for any embedding but need different
+    answers: a similarity hit is only taken when these tokens are the same.
+    """
+    return tuple(m.group(0).rstrip(".") for m in _GUARD.finditer(normalize_text(text)))
+
+
+def hashing_embedding(text: str, dim: int = 512) -> np.ndarray:
+    """A cheap local embedding: hashed character trigrams, L2-normalized.
+
+    Only good for near-identical wording (a typo, an extra word) without a network round
+    trip; "what's" vs "what is" already drops well below the default threshold. Pass a real
+    embedding function to ResponseCache for fuzzier matching.
+    """
+    text = f" {normalize_text(text)} "
+    buckets = [zlib.crc32(text[i : i + 3].encode()) % dim for i in range(len(text) - 2)]
+    vector = np.bincount(buckets, minlength=dim).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class ResponseCache:
+    """Caches final answers by question.
+
+    Lookups try the normalized question as an exact key, then fall back to a cosine-similarity
+    search over the cached question vectors (one matrix product in NumPy). A hit needs a
+    similarity of at least `threshold` and the same `guard_tokens` as the cached question. Entries expire after `ttl_seconds` and the least
+    recently used one is evicted once `max_entries` is reached.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 2048,
+        threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        embed: Callable[[str], np.ndarray] = hashing_embedding,
+    ):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.embed = embed
+        self._lock = threading.Lock()
+        # normalized question -> (row in self._vectors, answer, expires_at), least recently used first
+        self._entries: OrderedDict[str, tuple[int, str, float]] = OrderedDict()
+        self._keys_by_row: dict[int, str] = {}
+        self._free_rows = list(range(max_entries - 1, -1, -1))
+        self._vectors: Optional[np.ndarray] = None  # allocated once we know the embedding size
+        self._used = np.zeros(max_entries, dtype=bool)
+        self.counters = {"exact_hits": 0, "similar_hits": 0, "misses": 0}
+
+    def get(self, question: str) -> Optional[str]:
+        key = normalize_text(question)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[2] > now:
+                    self._entries.move_to_end(key)
+                    self.counters["exact_hits"] += 1
+                    return entry[1]
+                self._remove(key)
+
+        if self._vectors is None or not self._used.any():
+            with self._lock:
+                self.counters["misses"] += 1
+            return None
+
+        vector = self.embed(question)
+        guard = guard_tokens(key)
+        with self._lock:
+            scores = self._vectors @ vector
+            scores[~self._used] = -1.0
+            # ~ Best match first; one with other numbers or negations is skipped, not accepted
+            candidates = np.flatnonzero(scores >= self.threshold)
+            for row in candidates[np.argsort(-scores[candidates])]:
+                match = self._keys_by_row[int(row)]
+                if guard_tokens(match) != guard:
+                    continue
+                _, answer, expires_at = self._entries[match]
+                if expires_at > now:
+                    self._entries.move_to_end(match)
+                    self.counters["similar_hits"] += 1
+                    return answer
+                self._remove(match)
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, question: str, answer: str) -> None:
+        key = normalize_text(question)
+        vector = self.embed(question)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            if key in self._entries:
+                self._remove(key)
+            if not self._free_rows:
+                self._remove(next(iter(self._entries)))
+            row = self._free_rows.pop()
+            self._vectors[row] = vector
+            self._used[row] = True
+            self._keys_by_row[row] = key
+            self._entries[key] = (row, answer, time.monotonic() + self.ttl_seconds)
+
+    def _remove(self, key: str) -> None:
+        row, _, _ = self._entries.pop(key)
+        self._used[row] = False
+        del self._keys_by_row[row]
+        self._free_rows.append(row)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            entries = len(self._entries)
+        lookups = sum(counters.values())
+        hits = counters["exact_hits"] + counters["similar_hits"]
+        return {
+            "entries": entries,
+            "threshold": self.threshold,
+            **counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def cacheable_question(messages: list) -> Optional[str]:
+    """The user's question if this turn can be answered from the cache, else None.
+
+    Only the opening question of a thread qualifies: once there is an AI or tool message in
+    the state the right answer depends on the conversation so far (or we are in the middle
+    of a tool loop), so the cache is bypassed.
+    """
+    question = None
+    for message in messages:
+        if message.type in ("ai", "tool"):
+            return None
+        if message.type == "human":
+            question = message.content
+    return question if isinstance(question, str) else None
@@ -0,0 +1,68 @@
+"""Picks how each turn is answered, with local rules only (no model call to decide).
+
+- "canned": greetings, thanks, goodbyes; answered from a fixed reply, no model at all
+- "fast":   short small talk with nothing to look up or compute; the small model, no tools
+- "full":   everything else; the tool-bound model
+
+When in doubt the turn goes to "full": a wrong escalation only costs latency, a wrong
+fast-path answer costs correctness.
+"""
+
+import re
+from typing import Optional
+
+CANNED = "canned"
+FAST = "fast"
+FULL = "full"
+ROUTES = (CANNED, FAST, FULL)
+
+_GREETING = re.compile(
+    r"^(hi|hello|hey|yo|hiya|good (morning|afternoon|evening)|thanks|thank you|thx|ty|cheers|"
+    r"bye|goodbye|see you|ok|okay|cool|great|nice)( there)?[\s!.,:)]*$",
+    re.IGNORECASE,
+)
+_THANKS = re.compile(r"^(thanks|thank you|thx|ty|cheers)", re.IGNORECASE)
+_BYE = re.compile(r"^(bye|goodbye|see you)", re.IGNORECASE)
+_ACK = re.compile(r"^(ok|okay|cool|great|nice)", re.IGNORECASE)
+
+# ~ Anything that smells like a lookup or a computation needs the tools
+_NEEDS_TOOLS = re.compile(
+    r"\d|[+\-*/^=%]|\b(who|what|when|where|which|why|how|wiki|wikipedia|look up|lookup|search|"
+    r"calculate|compute|solve|python|code|run|execute|script|function|history|capital|population|"
+    r"born|died|founded|invented|define|explain|list|compare)\b",
+    re.IGNORECASE,
+)
+
+CANNED_REPLIES = {
+    "greeting": "Hello! How can I help you today?",
+    "thanks": "You're welcome! Anything else I can help with?",
+    "bye": "Goodbye! Come back any time.",
+    "ack": "Glad that helped. Anything else?",
+}
+
+_CANNED_TEXTS = set(CANNED_REPLIES.values())
+
+# ^ Longer than this and it is probably a real request, whatever the wording
+FAST_MAX_WORDS = 12
+
+
+def classify(text: str, previous_answer: Optional[str] = None) -> str:
+    """Route for the user message `text`; `previous_answer` is the assistant's last reply, if any."""
+    text = text.strip()
+    # ^ "ok" / "yes" answering a question the assistant asked means "go ahead"; the canned
+    # ^ replies' "How can I help?" doesn't count
+    if previous_answer and previous_answer.rstrip().endswith("?") and previous_answer not in _CANNED_TEXTS:
+        return FULL
+    if _GREETING.match(text):
+        return CANNED
+    if len(text.split()) <= FAST_MAX_WORDS and "?" not in text and not _NEEDS_TOOLS.search(text):
+        return FAST
+    return FULL
+
+
+def canned_reply(text: str) -> str:
+    text = text.strip()
+    for kind, pattern in (("thanks", _THANKS), ("bye", _BYE), ("ack", _ACK)):
+        if pattern.match(text):
+            return CANNED_REPLIES[kind]
+    return CANNED_REPLIES["greeting"]
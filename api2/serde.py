@@ -0,0 +1,98 @@
+"""A compact checkpoint serializer for chat state.
+
+LangGraph's default serializer writes each message as a full LangChain object: class
+path, every field name, response_metadata (model name, finish reason, token logprobs,
+system fingerprint), usage_metadata, and tool calls twice (`tool_calls` plus the raw
+OpenAI copy in additional_kwargs). None of that is needed to rebuild the conversation.
+
+Lists of messages are written instead as positional rows with an integer role:
+
+    [role, id, content, name, extra]
+
+where `extra` holds only what the role needs (tool calls for AI messages, tool_call_id
+and status for tool messages). Everything else goes through the default serializer.
+With `compress=True`, blobs of at least `min_compress_bytes` are zstd-compressed.
+"""
+
+from typing import Any, Optional
+
+import ormsgpack
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for compress=True
+    zstandard = None
+
+HUMAN, AI, TOOL, SYSTEM = range(4)
+_ROLE_OF = {HumanMessage: HUMAN, AIMessage: AI, ToolMessage: TOOL, SystemMessage: SYSTEM}
+
+MESSAGES = "messages"
+MESSAGES_ZSTD = "messages+zstd"
+
+
+def _pack(message) -> Optional[list]:
+    """One message as a row, or None if it carries something the row can't hold."""
+    role = _ROLE_OF.get(type(message))
+    if role is None:
+        return None
+    extra = None
+    if role == AI:
+        if message.invalid_tool_calls:
+            return None
+        extra = [[call["id"], call["name"], call["args"]] for call in message.tool_calls] or None
+    elif role == TOOL:
+        if message.artifact is not None:
+            return None
+        extra = [message.tool_call_id, message.status]
+    # ^ additional_kwargs only ever repeats tool_calls for OpenAI; anything else in it is kept
+    kwargs = {k: v for k, v in message.additional_kwargs.items() if k != "tool_calls"}
+    if kwargs:
+        return None
+    return [role, message.id, message.content, message.name, extra]
+
+
+def _unpack(row: list):
+    role, id_, content, name, extra = row
+    if role == HUMAN:
+        return HumanMessage(content=content, id=id_, name=name)
+    if role == AI:
+        tool_calls = [
+            {"id": call_id, "name": call_name, "args": args, "type": "tool_call"}
+            for call_id, call_name, args in extra or ()
+        ]
+        return AIMessage(content=content, id=id_, name=name, tool_calls=tool_calls)
+    if role == TOOL:
+        tool_call_id, status = extra
+        return ToolMessage(content=content, id=id_, name=name, tool_call_id=tool_call_id, status=status)
+    return SystemMessage(content=content, id=id_, name=name)
+
+
+class CompactSerializer(JsonPlusSerializer):
+    def __init__(self, *, compress: bool = False, level: int = 3, min_compress_bytes: int = 512, **kwargs):
+        super().__init__(**kwargs)
+        if compress and zstandard is None:
+            raise ImportError("compress=True needs the zstandard package")
+        self.compress = compress
+        self.min_compress_bytes = min_compress_bytes
+        self._compressor = zstandard.ZstdCompressor(level=level) if compress else None
+        self._decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        if isinstance(obj, list) and obj and all(type(m) in _ROLE_OF for m in obj):
+            rows = [_pack(m) for m in obj]
+            if None not in rows:
+                data = ormsgpack.packb(rows)
+                if self._compressor is not None and len(data) >= self.min_compress_bytes:
+                    return MESSAGES_ZSTD, self._compressor.compress(data)
+                return MESSAGES, data
+        return super().dumps_typed(obj)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, data_ = data
+        if type_ == MESSAGES_ZSTD:
+            return [_unpack(row) for row in ormsgpack.unpackb(self._decompressor.decompress(data_))]
+        if type_ == MESSAGES:
+            return [_unpack(row) for row in ormsgpack.unpackb(data_)]
+        return super().loads_typed(data)
@@ -0,0 +1,120 @@
+"""Single-flight: identical requests that overlap in time share one upstream run."""
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Hashable, Optional
+
+
+class FlightCancelled(Exception):
+    """The shared run was cancelled before it finished (raised to its remaining subscribers)."""
+
+
+class Flight:
+    """One run in progress. Every subscriber gets every chunk, from the first one on.
+
+    The run belongs to no one subscriber: it goes on while any of them is left, and is
+    cancelled when the last one goes away before it is done. Subscribe as soon as you
+    have the flight, not when you start reading, or it may be cancelled in between.
+    """
+
+    def __init__(self):
+        self.chunks: list = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.result = None  # whatever `result()` returned once the chunks ran out
+        self.task: Optional[asyncio.Task] = None
+        self.subscribers = 0
+        self.cancelled = False  # nobody was left; new requests must not join it
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        # ^ Wake everyone waiting on the current event, then start a fresh one for the next change
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def subscribe(self) -> AsyncIterator:
+        self.subscribers += 1
+        return self._chunks()
+
+    async def _chunks(self) -> AsyncIterator:
+        i = 0
+        try:
+            while True:
+                while i < len(self.chunks):
+                    yield self.chunks[i]
+                    i += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done and self.task is not None:
+                self.cancelled = True
+                self.task.cancel()  # nobody is left to send the answer to
+
+
+class SingleFlight:
+    """Tracks the runs in progress by key; a request whose key is in flight subscribes to it.
+
+    A flight is forgotten as soon as it finishes, so it only collapses requests that
+    overlap. Finished answers are the response cache's job.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, Flight] = {}
+        self.counters = {"leaders": 0, "followers": 0}
+
+    def get(self, key: Hashable) -> Optional[Flight]:
+        """The flight in progress for `key`, unless it is being cancelled."""
+        flight = self._flights.get(key)
+        return flight if flight is not None and not flight.cancelled else None
+
+    def lead(
+        self,
+        key: Hashable,
+        chunks: AsyncIterator,
+        *,
+        result: Optional[Callable[[], Awaitable]] = None,
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> Flight:
+        """Start consuming `chunks` in a background task that outlives any one subscriber."""
+        flight = self._flights[key] = Flight()
+        self.counters["leaders"] += 1
+        flight.task = asyncio.create_task(self._run(key, flight, chunks, result, on_done))
+        return flight
+
+    def follow(self, flight: Flight) -> AsyncIterator:
+        self.counters["followers"] += 1
+        return flight.subscribe()
+
+    async def _run(self, key, flight: Flight, chunks, result, on_done) -> None:
+        try:
+            async for chunk in chunks:
+                flight.chunks.append(chunk)
+                flight._notify()
+            if result is not None:
+                flight.result = await result()
+        except Exception as e:
+            flight.error = e
+        except asyncio.CancelledError:
+            # ^ Not the subscribers' own cancellation: they get an error, not an answer cut short
+            flight.error = FlightCancelled("the shared run was cancelled")
+            raise
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.done = True
+            flight._notify()
+            if on_done is not None:
+                on_done()
+
+    def stats(self) -> dict:
+        leaders, followers = self.counters["leaders"], self.counters["followers"]
+        total = leaders + followers
+        return {
+            "in_flight": len(self._flights),
+            **self.counters,
+            # ^ Share of requests that didn't need their own upstream run
+            "collapse_ratio": round(followers / total, 3) if total else 0.0,
+        }
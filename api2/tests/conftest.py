@@ -0,0 +1,47 @@
+"""The app is imported once per test session with the OpenAI model and Wikipedia swapped for the
+offline fakes from bench.py (see `load_app`)."""
+
+import argparse
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test-offline")
+os.environ.setdefault("REPL_WORKERS", "1")
+os.environ.setdefault("QUEUE_TIMEOUT_SECONDS", "2")
+
+
+@pytest.fixture(scope="session")
+def main():
+    from bench import load_app
+
+    return load_app(argparse.Namespace(first_token_ms=0, tokens_per_second=1e6, reply_tokens=5, tool_ms=0))
+
+
+@pytest.fixture
+def client(main):
+    from fastapi.testclient import TestClient
+
+    # ^ Errors come back as responses, as they would from uvicorn
+    with TestClient(main.app, raise_server_exceptions=False) as client:
+        yield client
+
+
+@pytest.fixture
+def graph(main, monkeypatch):
+    """The compiled graph on a fresh in-memory checkpointer, without the app's lifespan."""
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    monkeypatch.setattr(main, "graph", main.compiled_graph.copy(update={"checkpointer": InMemorySaver()}))
+
+
+def answer(main, message: str, session_id: str, budget=None) -> str:
+    """One /chat turn's text, straight from the graph."""
+
+    async def collect():
+        return "".join([line async for line in main.answer_lines(message, session_id, budget)])
+
+    return asyncio.run(collect())
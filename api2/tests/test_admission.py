@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from bench import FakeChatModel
+
+
+class FailingOnce(FakeChatModel):
+    failures: int = 1
+
+    def _reply(self, messages):
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("upstream model error")
+        return super()._reply(messages)
+
+
+def use_model(main, monkeypatch, model):
+    for name in ("model", "llm_with_tools", "llm_final", "fast_model"):
+        monkeypatch.setattr(main, name, model)
+
+
+def test_failed_chat_turn_releases_slot_and_session(main, client, monkeypatch):
+    use_model(main, monkeypatch, FailingOnce(first_token_latency=0, tokens_per_second=1e6, reply_tokens=5))
+    body = {"message": "Tell me a story about a lighthouse keeper", "session_id": "admission-failed-turn"}
+
+    with client.stream("POST", "/chat", json=body) as response:
+        try:
+            response.read()
+        except Exception:
+            pass  # the stream is cut off mid-body
+    assert main.admission.stats()["in_flight"] == 0
+
+    # ~ Same session again: must not wait on the first turn's session lock (429 after the queue timeout)
+    response = client.post("/chat", json=body)
+    assert response.status_code == 200
+    assert "token0" in response.text
+    assert main.admission.stats()["in_flight"] == 0
+
+
+def test_failed_stream_turn_releases_slot_and_session(main, client, monkeypatch):
+    use_model(main, monkeypatch, FailingOnce(first_token_latency=0, tokens_per_second=1e6, reply_tokens=5))
+    body = {"message": "Tell me a story about a lighthouse keeper", "session_id": "admission-failed-stream"}
+
+    response = client.post("/chat/stream", json=body)
+    assert "event: error" in response.text
+    assert main.admission.stats()["in_flight"] == 0
+
+    response = client.post("/chat/stream", json=body)
+    assert response.status_code == 200
+    assert "token0" in response.text
+    assert main.admission.stats()["in_flight"] == 0
+
+
+def test_slot_released_when_client_leaves_before_the_body_starts(main):
+    async def go():
+        ticket = await main.admission.acquire("admission-gone-early")
+        started = []
+
+        async def body():
+            started.append(True)
+            yield "never sent"
+
+        async def send(message):
+            raise OSError("client went away")
+
+        response = main.AdmittedResponse(body(), ticket)
+        scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+        with pytest.raises(Exception):
+            await response(scope, None, send)
+        assert not started
+        assert main.admission.stats()["in_flight"] == 0
+
+    asyncio.run(go())
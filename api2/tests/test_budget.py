@@ -0,0 +1,43 @@
+import time
+
+from langchain_core.messages import AIMessage
+
+from bench import FakeChatModel
+from budget import DEADLINE, STEPS, TurnBudget
+from conftest import answer
+
+
+class ToolLoop(FakeChatModel):
+    """Asks for another lookup every time, until it is told the budget is spent."""
+
+    def _reply(self, messages):
+        if messages[-1].type == "system" and "budget" in messages[-1].content:
+            return AIMessage(content="best effort answer")
+        n = sum(m.type == "tool" for m in messages)
+        return AIMessage(content="", tool_calls=[{"name": "wikipedia", "args": {"query": f"topic {n}"}, "id": f"call_{n}"}])
+
+
+def test_tool_rounds_are_capped(main, graph, monkeypatch):
+    model = ToolLoop(first_token_latency=0, tokens_per_second=1e6)
+    for name in ("model", "llm_with_tools", "llm_final"):
+        monkeypatch.setattr(main, name, model)
+
+    budget = TurnBudget(deadline_seconds=10, max_tool_rounds=2, reserve_seconds=1)
+    text = answer(main, "please research this deeply and explain", "budget-steps", budget)
+
+    assert text.strip().endswith("best effort answer")
+    assert budget.usage()["tool_rounds"] == 2
+    assert budget.exhausted_by == STEPS
+
+
+def test_fast_reply_is_bounded_by_the_deadline(main, graph, monkeypatch):
+    monkeypatch.setattr(main, "fast_model", FakeChatModel(first_token_latency=5, tokens_per_second=1e6))
+
+    budget = TurnBudget(deadline_seconds=0.5, reserve_seconds=0.1)
+    started = time.perf_counter()
+    text = answer(main, "I feel a bit tired today", "budget-fast", budget)
+
+    assert time.perf_counter() - started < 2
+    assert "ran out of time" in text
+    assert budget.exhausted_by == DEADLINE
+    assert budget.usage()["llm_calls"] == 1
@@ -0,0 +1,38 @@
+import json
+import logging
+
+from test_admission import FailingOnce, use_model
+
+
+def events(text: str) -> dict:
+    """The named SSE events of a /chat/stream body, by name."""
+    found = {}
+    for block in text.split("\n\n"):
+        lines = block.split("\n")
+        if lines[0].startswith("event: "):
+            found[lines[0].removeprefix("event: ")] = json.loads(lines[1].removeprefix("data: "))
+    return found
+
+
+def test_stream_ends_with_turn_metrics(client):
+    response = client.post("/chat/stream", json={"message": "Tell me a story about a lighthouse keeper"})
+    turn_metrics = events(response.text)["metrics"]
+
+    assert turn_metrics["tokens"] > 0 and turn_metrics["ttft_ms"] is not None
+    assert turn_metrics["hops"]["llm_calls"] == 1
+    assert response.text.endswith("data: [END]\n\n")
+
+
+def test_failed_stream_is_logged_and_counted(main, client, monkeypatch, caplog):
+    use_model(main, monkeypatch, FailingOnce(first_token_latency=0, tokens_per_second=1e6))
+    before = main.chat_errors._values.get(("chat_stream",), 0)
+
+    with caplog.at_level(logging.ERROR, logger="main"):
+        response = client.post(
+            "/chat/stream", json={"message": "Tell me a story about a lighthouse keeper", "session_id": "stream-failed"}
+        )
+
+    assert events(response.text)["error"] == "upstream model error"
+    assert "upstream model error" in caplog.text
+    assert main.chat_errors._values[("chat_stream",)] == before + 1
+    assert 'chat_errors_total{endpoint="chat_stream"}' in client.get("/metrics").text
@@ -0,0 +1,164 @@
+import sqlite3
+from typing import Annotated
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+from typing_extensions import TypedDict
+
+from checkpointers import BoundedMemorySaver, SqliteSaver
+from serde import MESSAGES, CompactSerializer
+
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+
+
+def run_turns(saver, turns: int = 5):
+    def chatbot(state: State):
+        return {
+            "messages": [
+                AIMessage(
+                    content=f"answer {len(state['messages'])}",
+                    response_metadata={"model_name": "gpt-4o-mini-2024-07-18", "finish_reason": "stop"},
+                    usage_metadata={"input_tokens": 120, "output_tokens": 40, "total_tokens": 160},
+                )
+            ]
+        }
+
+    builder = StateGraph(State)
+    builder.add_node("chatbot", chatbot)
+    builder.add_edge(START, "chatbot")
+    builder.add_edge("chatbot", END)
+    graph = builder.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "t"}}
+    for turn in range(turns):
+        graph.invoke({"messages": [("user", f"question {turn}")]}, config)
+    return graph.get_state(config).values["messages"]
+
+
+def latest_row(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT type, checkpoint FROM checkpoints ORDER BY checkpoint_id DESC LIMIT 1").fetchone()
+
+
+def test_sqlite_checkpoint_row_stores_messages_compacted(tmp_path):
+    with SqliteSaver(str(tmp_path / "compact.sqlite"), serde=CompactSerializer()) as saver:
+        messages = run_turns(saver)
+    type_, data = latest_row(tmp_path / "compact.sqlite")
+
+    assert type_ == "channels+msgpack"
+    channel_values = CompactSerializer().loads_typed(("msgpack", data))["channel_values"]
+    assert channel_values["messages"][0] == MESSAGES
+    assert len(messages) == 10 and messages[-1].content == "answer 9"
+
+
+def test_sqlite_checkpoint_row_is_smaller_than_default(tmp_path):
+    with SqliteSaver(str(tmp_path / "default.sqlite")) as saver:
+        run_turns(saver)
+    with SqliteSaver(str(tmp_path / "compact.sqlite"), serde=CompactSerializer()) as saver:
+        run_turns(saver)
+
+    default_size = len(latest_row(tmp_path / "default.sqlite")[1])
+    compact_size = len(latest_row(tmp_path / "compact.sqlite")[1])
+    assert compact_size < default_size * 0.6
+
+
+def test_sqlite_reads_rows_written_before_the_split(tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    with SqliteSaver(path) as saver:
+        run_turns(saver, turns=1)
+        config = {"configurable": {"thread_id": "t"}}
+        checkpoint = saver.get_tuple(config).checkpoint
+    # ~ Rewrite the row the way it used to be stored: the whole checkpoint in one blob
+    with sqlite3.connect(path) as conn:
+        type_, data = JsonPlusSerializer().dumps_typed(checkpoint)
+        conn.execute("UPDATE checkpoints SET type = ?, checkpoint = ? WHERE checkpoint_id = ?", (type_, data, checkpoint["id"]))
+
+    with SqliteSaver(path) as saver:
+        messages = run_turns(saver, turns=1)
+    assert [m.content for m in messages] == ["question 0", "answer 1", "question 0", "answer 3"]
+
+
+def run_revised_turns(saver, turns: int = 6):
+    """Each turn answers, then replaces that answer by id: same content, now with a tool call."""
+
+    def chatbot(state: State):
+        n = len(state["messages"])
+        return {"messages": [AIMessage(content=f"answer {n}", id=f"ai-{n}")]}
+
+    def revise(state: State):
+        last = state["messages"][-1]
+        call = {"id": f"call-{last.id}", "name": "wikipedia", "args": {"query": last.content}}
+        return {"messages": [AIMessage(content=last.content, id=last.id, tool_calls=[call])]}
+
+    builder = StateGraph(State)
+    builder.add_node("chatbot", chatbot)
+    builder.add_node("revise", revise)
+    builder.add_edge(START, "chatbot")
+    builder.add_edge("chatbot", "revise")
+    builder.add_edge("revise", END)
+    graph = builder.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "t"}}
+    for turn in range(turns):
+        graph.invoke({"messages": [HumanMessage(content=f"question {turn}", id=f"human-{turn}")]}, config)
+    return [
+        [(m.id, m.type, m.content, getattr(m, "tool_calls", None)) for m in snapshot.values.get("messages", [])]
+        for snapshot in graph.get_state_history(config)
+    ]
+
+
+def test_bounded_saver_delta_history_matches_in_memory_saver():
+    expected = run_revised_turns(InMemorySaver())
+    for full_every in (0, 3, 8):
+        saver = BoundedMemorySaver(full_every=full_every, keep_last=0, serde=CompactSerializer())
+        assert run_revised_turns(saver) == expected
+
+
+def test_bounded_saver_delta_round_trip():
+    saver = BoundedMemorySaver(full_every=4, serde=CompactSerializer())
+    messages = run_turns(saver, turns=10)
+    assert [m.content for m in messages] == [
+        text for turn in range(10) for text in (f"question {turn}", f"answer {2 * turn + 1}")
+    ]
+    assert any(blob[0] == "delta" for blob in saver.blobs.values())
+
+
+def test_bounded_saver_delta_channel_history_resolves_deltas():
+    saver = BoundedMemorySaver(full_every=4, serde=CompactSerializer())
+    run_turns(saver, turns=3)
+    # ~ A checkpoint whose parent's message list is stored as a delta
+    for checkpoint_tuple in saver.list({"configurable": {"thread_id": "t"}}):
+        parent = checkpoint_tuple.parent_config
+        version = parent and saver.get_tuple(parent).checkpoint["channel_versions"].get("messages")
+        if version and saver.blobs[("t", "", "messages", version)][0] == "delta":
+            config = checkpoint_tuple.config
+            break
+
+    history = saver.get_delta_channel_history(config=config, channels=["messages"])
+    assert history["messages"]["seed"] == saver.get_tuple(parent).checkpoint["channel_values"]["messages"]
+
+
+def test_bounded_saver_keeps_last_checkpoints_per_thread():
+    sizes = []
+    for turns in (10, 30):
+        saver = BoundedMemorySaver(full_every=4, keep_last=3, serde=CompactSerializer())
+        messages = run_turns(saver, turns=turns)
+        assert len(messages) == 2 * turns and messages[-1].content == f"answer {2 * turns - 1}"
+        assert len(list(saver.list({"configurable": {"thread_id": "t"}}))) == 3
+        sizes.append((len(saver.blobs), len(saver.writes)))
+    # ~ Storage stays flat as the thread grows: old checkpoints, their writes and unused blobs go
+    assert sizes[1][0] <= sizes[0][0] and sizes[1][1] <= sizes[0][1]
+
+
+def test_bounded_saver_reading_unknown_threads_evicts_nothing():
+    saver = BoundedMemorySaver(max_threads=1)
+    run_turns(saver, turns=1)
+    for n in range(5):
+        assert saver.get_tuple({"configurable": {"thread_id": f"unknown-{n}", "checkpoint_ns": ""}}) is None
+
+    assert saver.stats()["threads"] == 1 and saver.evicted == 0
+    assert list(saver.storage) == ["t"]
+    assert saver.get_tuple({"configurable": {"thread_id": "t", "checkpoint_ns": ""}}) is not None
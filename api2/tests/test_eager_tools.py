@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from langchain_core.tools import tool
+
+from bench import FakeChatModel
+from budget import TurnBudget
+from conftest import answer
+from eager_tools import EagerToolExecutor
+
+lookups = []
+
+
+@tool
+async def wikipedia(query: str) -> str:
+    """Look up a page."""
+    lookups.append(query)
+    return f"Page: {query}"
+
+
+def ask(executor: EagerToolExecutor, text: str, budget=None):
+    model = FakeChatModel(first_token_latency=0, tokens_per_second=1e6)
+
+    async def go():
+        response = await executor.ainvoke(model, [("human", text)], run="thread", budget=budget)
+        task = executor.take("thread", response.tool_calls[0]["id"]) if response.tool_calls else None
+        return response, (await task if task else None)
+
+    return asyncio.run(go())
+
+
+def test_tool_call_starts_while_streaming():
+    lookups.clear()
+    executor = EagerToolExecutor([wikipedia])
+    response, result = ask(executor, "please look up Ada Lovelace")
+
+    assert response.tool_calls[0]["name"] == "wikipedia"
+    assert result.content == "Page: please look up Ada Lovelace"
+    assert executor.stats()["early"] == 1 and executor.stats()["running"] == 0
+
+
+def test_no_tool_call_starts_once_the_budget_is_exhausted():
+    lookups.clear()
+    executor = EagerToolExecutor([wikipedia])
+    response, result = ask(executor, "please look up Ada Lovelace", budget=TurnBudget(max_tool_rounds=0))
+
+    assert response.tool_calls  # still asked for: the tools node decides what happens to it
+    assert result is None and lookups == []
+    assert executor.stats()["early"] == 0
+
+
+class EmptyStream(FakeChatModel):
+    """A model whose astream yields nothing (BaseChatModel raises instead, other runnables may not)."""
+
+    async def astream(self, messages, **kwargs):
+        return
+        yield
+
+
+def test_empty_stream_falls_back_to_ainvoke():
+    executor = EagerToolExecutor([wikipedia])
+    model = EmptyStream(first_token_latency=0, tokens_per_second=1e6, reply_tokens=3)
+    response = asyncio.run(executor.ainvoke(model, [("human", "hello")], run="thread"))
+    assert response.content == "token0 token1 token2"
+
+
+def test_failed_run_cancels_its_started_calls(main, graph, monkeypatch):
+    executor = EagerToolExecutor(main.tools)
+    monkeypatch.setattr(main, "eager_tools", executor)
+
+    def fail(response, node):
+        # ^ The chatbot node fails after its model call, so the tools node never collects the call
+        assert executor.stats()["running"] == 1
+        raise RuntimeError("chatbot failed")
+
+    monkeypatch.setattr(main, "count_usage", fail)
+    with pytest.raises(RuntimeError):
+        answer(main, "please look up Ada Lovelace", "eager-failed-run")
+    assert executor.stats()["running"] == 0
@@ -0,0 +1,57 @@
+import logging
+import sys
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from budget import TurnBudget
+from conftest import answer
+from history import count_tokens, load_encoding, message_tokens, split_history
+
+
+def summarize_tokens(main) -> dict:
+    return {key: value for key, value in main.llm_tokens._values.items() if key[0] == "summarize"}
+
+
+def test_summary_call_is_counted(main, graph, monkeypatch):
+    # ^ A budget this small pushes the previous turn out of the window, so the second turn summarizes it
+    monkeypatch.setattr(main, "HISTORY_TOKEN_BUDGET", 10)
+    before = summarize_tokens(main)
+
+    answer(main, "please explain the plot of hamlet", "history-usage")
+    budget = TurnBudget(deadline_seconds=10)
+    answer(main, "please explain the plot of macbeth", "history-usage", budget)
+
+    after = summarize_tokens(main)
+    assert after.get(("summarize", "input"), 0) > before.get(("summarize", "input"), 0)
+    assert after.get(("summarize", "output"), 0) > before.get(("summarize", "output"), 0)
+    # ~ The summary and the answer
+    assert budget.usage()["llm_calls"] == 2
+
+
+@pytest.fixture
+def no_tiktoken(monkeypatch):
+    # ^ As offline: the encoding can't be loaded
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+    load_encoding.cache_clear()
+    yield
+    load_encoding.cache_clear()
+
+
+def test_fallback_estimate_warns(no_tiktoken, caplog):
+    with caplog.at_level(logging.WARNING, logger="history"):
+        assert load_encoding() is None
+    assert "estimate" in caplog.text
+    assert count_tokens("x" * 40) == 11
+
+
+def test_windowing_with_fallback_estimate(no_tiktoken):
+    turns = []
+    for turn in range(4):
+        turns += [HumanMessage(content="q" * 40, id=f"h{turn}"), AIMessage(content="a" * 80, id=f"a{turn}")]
+    # ^ 15 + 25 tokens per turn with the estimate: two turns fit in 80
+    older, recent = split_history(turns, 80)
+
+    assert [m.id for m in older] == ["h0", "a0", "h1", "a1"]
+    assert [m.id for m in recent] == ["h2", "a2", "h3", "a3"]
+    assert sum(message_tokens(m) for m in recent) <= 80
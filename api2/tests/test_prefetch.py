@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+import pytest
+
+from prefetch import Prefetcher, guess_query
+from tool_cache import LookupCache
+
+
+class SlowWikipedia:
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.calls = []
+
+    def __call__(self, query: str) -> str:
+        self.calls.append(query)
+        time.sleep(self.latency)
+        return f"Page: {query}"
+
+
+def make_prefetcher(latency: float = 0.05, **kwargs):
+    fetch = SlowWikipedia(latency)
+    return Prefetcher(LookupCache(fetch), **kwargs), fetch
+
+
+def wiki_call(query: str) -> dict:
+    return {"name": "wikipedia", "args": {"query": query}, "id": "call_1"}
+
+
+@pytest.mark.parametrize(
+    "text, query",
+    [
+        ("Who was Ada Lovelace?", "Ada Lovelace"),
+        ("tell me about the Rust programming language", "Rust programming language"),
+        ("What is the capital of France", "France"),
+        ("what is 2 + 2", None),
+        ("write a python function to sort a list", None),
+        ("hello there", None),
+    ],
+)
+def test_guess_query(text, query):
+    assert guess_query(text) == query
+
+
+def test_hit_is_served_from_the_prefetch():
+    async def go():
+        prefetcher, fetch = make_prefetcher()
+        key = prefetcher.start("Who was Ada Lovelace?")
+        await asyncio.sleep(0)  # the model call runs meanwhile
+        prefetcher.settle(key, [wiki_call("ada lovelace")])
+        assert await prefetcher.alookup("Ada Lovelace") == "Page: Ada Lovelace"
+        assert fetch.calls == ["Ada Lovelace"]
+        stats = prefetcher.stats()
+        assert stats["hits"] == 1 and stats["hit_ratio"] == 1.0 and stats["in_flight"] == 0
+
+    asyncio.run(go())
+
+
+def test_waste_cancels_the_prefetch():
+    async def go():
+        prefetcher, _ = make_prefetcher(latency=0.2)
+        key = prefetcher.start("Who was Ada Lovelace?")
+        await asyncio.sleep(0)
+        prefetcher.settle(key, [])  # the model answered without a lookup
+        stats = prefetcher.stats()
+        assert stats["wasted"] == 1 and stats["cancelled"] == 1 and stats["in_flight"] == 0
+
+    asyncio.run(go())
+
+
+def test_tool_call_before_settle_is_counted_early():
+    async def go():
+        prefetcher, fetch = make_prefetcher()
+        key = prefetcher.start("Who was Ada Lovelace?")
+        # ~ An eager tool call, made while the model is still streaming
+        assert await prefetcher.alookup("ada lovelace") == "Page: Ada Lovelace"
+        prefetcher.settle(key, [wiki_call("Ada Lovelace")])
+        assert prefetcher.stats()["in_flight"] == 0  # not left waiting for a tool call that already came
+        assert prefetcher.stats()["hits"] == 1 and fetch.calls == ["Ada Lovelace"]
+
+    asyncio.run(go())
+
+
+def test_joined_prefetch_outlives_a_wasted_owner():
+    async def go():
+        prefetcher, fetch = make_prefetcher()
+        first = prefetcher.start("Who was Ada Lovelace?")
+        second = prefetcher.start("who was ada lovelace")
+        assert first == second and prefetcher.stats()["joined"] == 1
+        prefetcher.settle(first, [])
+        prefetcher.settle(second, [wiki_call("Ada Lovelace")])
+        assert await prefetcher.alookup("Ada Lovelace") == "Page: Ada Lovelace"
+        assert prefetcher.stats()["cancelled"] == 0 and fetch.calls == ["Ada Lovelace"]
+
+    asyncio.run(go())
+
+
+def test_cancelled_tool_call_leaves_the_prefetch_running():
+    async def go():
+        prefetcher, fetch = make_prefetcher(latency=0.1)
+        key = prefetcher.start("Who was Ada Lovelace?")
+        prefetcher.settle(key, [wiki_call("Ada Lovelace")])
+        # ^ Two turns asking at once: one of them is cancelled while waiting on the shared lookup
+        prefetcher.start("Who was Ada Lovelace?")
+        first = asyncio.create_task(prefetcher.alookup("Ada Lovelace"))
+        second = asyncio.create_task(prefetcher.alookup("Ada Lovelace"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second == "Page: Ada Lovelace"
+        assert fetch.calls == ["Ada Lovelace"]
+
+    asyncio.run(go())
+
+
+def test_tool_call_falls_back_when_the_prefetch_is_dropped():
+    async def go():
+        prefetcher, fetch = make_prefetcher(latency=0.1)
+        key = prefetcher.start("Who was Ada Lovelace?")
+        waiting = asyncio.create_task(prefetcher.alookup("Ada Lovelace"))
+        await asyncio.sleep(0.01)
+        prefetcher.settle(key, [])  # the model asked for something else; the prefetch is cancelled
+        assert await waiting == "Page: Ada Lovelace"
+        assert fetch.calls == ["Ada Lovelace", "Ada Lovelace"]
+
+    asyncio.run(go())
+
+
+def test_stale_prefetch_is_dropped():
+    async def go():
+        prefetcher, _ = make_prefetcher(latency=0.2, max_age=0)
+        prefetcher.start("Who was Ada Lovelace?")
+        await asyncio.sleep(0.01)
+        prefetcher.start("Who was Alan Turing?")  # start() drops what is older than max_age
+        assert prefetcher.stats()["cancelled"] == 1 and prefetcher.stats()["in_flight"] == 1
+
+    asyncio.run(go())
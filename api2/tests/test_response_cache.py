@@ -0,0 +1,48 @@
+import pytest
+
+from response_cache import ResponseCache, guard_tokens
+
+
+@pytest.mark.parametrize(
+    "cached, asked",
+    [
+        ("who was the first president", "who was the 41st president"),
+        ("what's new in python 3.11", "what's new in python 3.12"),
+        ("is it safe to eat raw eggs", "is it not safe to eat raw eggs"),
+    ],
+)
+def test_near_miss_is_not_a_hit(cached, asked):
+    # ^ Threshold low enough that the embedding alone would accept them
+    cache = ResponseCache(threshold=0.8)
+    cache.put(cached, "cached answer")
+    assert cache.get(asked) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_default_threshold_rejects_near_misses():
+    cache = ResponseCache()
+    cache.put("what's new in python 3.11", "cached answer")
+    cache.put("is it safe to eat raw eggs", "cached answer")
+    assert cache.get("what's new in python 3.12") is None
+    assert cache.get("is it not safe to eat raw eggs") is None
+
+
+def test_similar_question_with_same_numbers_hits():
+    cache = ResponseCache()
+    cache.put("how do I reverse a list in python 3", "use reversed()")
+    assert cache.get("How do I reverse a list in Python 3?") == "use reversed()"
+    assert cache.stats()["similar_hits"] == 1
+
+
+def test_guarded_candidate_is_skipped_for_the_next_best():
+    cache = ResponseCache(threshold=0.8)
+    cache.put("what's new in python 3.12", "3.12 answer")
+    cache.put("what's new in python 3.11 release", "3.11 answer")
+    assert cache.get("what's new in python 3.11") == "3.11 answer"
+
+
+def test_guard_tokens():
+    assert guard_tokens("Who was the 41st president?") == ("41st",)
+    assert guard_tokens("what's new in python 3.11?") == ("3.11",)
+    assert guard_tokens("isn't it safe") == ("n't",)
+    assert guard_tokens("what is the capital of france") == ()
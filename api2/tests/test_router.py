@@ -0,0 +1,69 @@
+import pytest
+
+import router
+from bench import FakeChatModel
+from conftest import answer
+
+
+@pytest.mark.parametrize(
+    "text, route",
+    [
+        ("hi", router.CANNED),
+        ("Thanks!", router.CANNED),
+        ("good morning :)", router.CANNED),
+        ("I had a long day at work", router.FAST),
+        ("that sounds lovely", router.FAST),
+        ("who was Ada Lovelace", router.FULL),
+        ("what is 17 * 23", router.FULL),
+        ("are you sure", router.FAST),
+        ("are you sure?", router.FULL),
+        ("please look up the history of Rome", router.FULL),
+        ("tell me a long story about a dragon who lived in a castle by the sea", router.FULL),
+    ],
+)
+def test_classify(text, route):
+    assert router.classify(text) == route
+
+
+def test_reply_to_a_question_goes_to_the_full_model():
+    assert router.classify("ok", previous_answer="Shall I look that up for you?") == router.FULL
+    assert router.classify("ok", previous_answer="Paris is the capital of France.") == router.CANNED
+    # ^ The canned greeting asks a question too, but not one "ok" answers
+    assert router.classify("ok", previous_answer=router.CANNED_REPLIES["greeting"]) == router.CANNED
+
+
+def test_canned_reply():
+    assert router.canned_reply("thanks a lot") == router.CANNED_REPLIES["thanks"]
+    assert router.canned_reply("bye!") == router.CANNED_REPLIES["bye"]
+    assert router.canned_reply("cool") == router.CANNED_REPLIES["ack"]
+    assert router.canned_reply("hello") == router.CANNED_REPLIES["greeting"]
+
+
+class Recording(FakeChatModel):
+    label: str = ""
+    calls: int = 0
+
+    def _reply(self, messages):
+        self.calls += 1
+        message = super()._reply(messages)
+        message.content = f"{self.label} answer"
+        return message
+
+
+@pytest.mark.parametrize(
+    "text, expected, calls",
+    [
+        ("hello", router.CANNED_REPLIES["greeting"], (0, 0)),
+        ("I had a long day at work", "fast answer", (1, 0)),
+        ("explain how rainbows form", "full answer", (0, 1)),
+    ],
+)
+def test_turns_take_their_route_through_the_graph(main, graph, monkeypatch, text, expected, calls):
+    fast = Recording(label="fast", first_token_latency=0, tokens_per_second=1e6)
+    full = Recording(label="full", first_token_latency=0, tokens_per_second=1e6)
+    monkeypatch.setattr(main, "fast_model", fast)
+    monkeypatch.setattr(main, "llm_with_tools", full)
+
+    assert answer(main, text, f"router-{text}").strip() == expected
+    # ~ Only the route's own model is called; a canned reply calls none
+    assert (fast.calls, full.calls) == calls
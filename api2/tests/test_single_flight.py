@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from single_flight import FlightCancelled, SingleFlight
+
+
+async def slow_chunks(n: int = 3, delay: float = 0.01):
+    for i in range(n):
+        await asyncio.sleep(delay)
+        yield f"chunk{i}"
+
+
+async def read_all(chunks) -> list:
+    return [chunk async for chunk in chunks]
+
+
+def test_followers_keep_the_run_alive_when_the_leader_leaves():
+    async def go():
+        single_flight = SingleFlight()
+
+        async def result():
+            return "state"
+
+        flight = single_flight.lead("q", slow_chunks(), result=result)
+        leader = flight.subscribe()
+        follower = single_flight.follow(flight)
+        assert await leader.__anext__() == "chunk0"
+        await leader.aclose()  # the leader's client went away
+
+        assert await read_all(follower) == ["chunk0", "chunk1", "chunk2"]
+        assert flight.result == "state" and not flight.cancelled
+
+    asyncio.run(go())
+
+
+def test_last_subscriber_leaving_cancels_the_run():
+    async def go():
+        single_flight = SingleFlight()
+        flight = single_flight.lead("q", slow_chunks())
+        only = flight.subscribe()
+        await only.__anext__()
+        await only.aclose()
+
+        assert flight.cancelled
+        assert single_flight.get("q") is None  # nobody joins a run on its way out
+        await asyncio.wait([flight.task])
+        assert flight.done and flight.task.cancelled()
+
+    asyncio.run(go())
+
+
+def test_cancelled_run_is_an_error_for_its_subscribers():
+    async def go():
+        single_flight = SingleFlight()
+        flight = single_flight.lead("q", slow_chunks(delay=1))
+        follower = single_flight.follow(flight)
+        await asyncio.sleep(0)
+        flight.task.cancel()  # e.g. the server shutting down
+
+        with pytest.raises(FlightCancelled):
+            await read_all(follower)
+
+    asyncio.run(go())
+
+
+def test_follower_of_a_cancelled_leader_gets_an_error_not_a_crash(main, graph):
+    async def go():
+        flight = main.single_flight.lead(("test", "cancelled-leader"), slow_chunks(delay=1))
+        follower = main.follow(flight, "single-flight-follower")
+        await asyncio.sleep(0)
+        flight.task.cancel()
+
+        with pytest.raises(FlightCancelled):
+            await read_all(follower)
+
+    asyncio.run(go())
+
+
+def test_follower_without_a_result_still_gets_its_chunks(main, graph):
+    async def go():
+        flight = main.single_flight.lead(("test", "no-result"), slow_chunks())
+        follower = main.follow(flight, "single-flight-no-result")
+        assert await read_all(follower) == ["chunk0", "chunk1", "chunk2"]
+        state = await main.graph.aget_state({"configurable": {"thread_id": "single-flight-no-result"}})
+        assert state.values == {}
+
+    asyncio.run(go())
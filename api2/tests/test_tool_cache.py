@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from langchain_core.tools import tool
+
+from tool_cache import WIKIPEDIA_MISS, LookupCache, cached_tool, normalize_query
+
+
+class FakeWikipedia:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, query: str) -> str:
+        self.calls.append(query)
+        if query == "boom":
+            raise ConnectionError("wikipedia is down")
+        if "nothing" in query:
+            return WIKIPEDIA_MISS
+        return f"Page: {query}"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(**kwargs):
+    fetch, clock = FakeWikipedia(), Clock()
+    cache = LookupCache(fetch, **kwargs)
+    cache._now = clock
+    return cache, fetch, clock
+
+
+def test_normalized_queries_share_an_entry():
+    cache, fetch, _ = make_cache()
+    assert cache.lookup("  Who was  Ada Lovelace? ") == "Page:   Who was  Ada Lovelace? "
+    assert cache.lookup("who was ada lovelace") == "Page:   Who was  Ada Lovelace? "
+    assert len(fetch.calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    assert normalize_query("  Who was  Ada Lovelace? ") == "who was ada lovelace"
+
+
+def test_entries_expire_after_the_ttl():
+    cache, fetch, clock = make_cache(ttl_seconds=60)
+    cache.lookup("rust")
+    clock.now += 59
+    cache.lookup("rust")
+    clock.now += 2
+    cache.lookup("rust")
+    assert len(fetch.calls) == 2
+
+
+def test_misses_are_cached_for_the_negative_ttl():
+    cache, fetch, clock = make_cache(ttl_seconds=3600, negative_ttl_seconds=10)
+    assert cache.lookup("nothing here") == WIKIPEDIA_MISS
+    assert cache.lookup("nothing here") == WIKIPEDIA_MISS
+    assert cache.stats()["negative_hits"] == 1
+    clock.now += 11
+    cache.lookup("nothing here")
+    assert len(fetch.calls) == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache, fetch, _ = make_cache(max_entries=2)
+    cache.lookup("a")
+    cache.lookup("b")
+    cache.lookup("a")  # "b" is now the least recently used
+    cache.lookup("c")
+    cache.lookup("a")
+    cache.lookup("b")
+    assert fetch.calls == ["a", "b", "c", "b"]
+
+
+def test_exceptions_are_not_cached():
+    cache, fetch, _ = make_cache()
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            cache.lookup("boom")
+    assert len(fetch.calls) == 2 and cache.stats()["entries"] == 0
+
+
+def test_sqlite_store_survives_a_restart(tmp_path):
+    path = str(tmp_path / "lookups.sqlite")
+    cache, fetch, clock = make_cache(path=path, ttl_seconds=60)
+    cache.lookup("ada lovelace")
+
+    restarted, fetch_again, clock_again = make_cache(path=path, ttl_seconds=60)
+    clock_again.now = clock.now
+    assert restarted.lookup("Ada Lovelace") == "Page: ada lovelace"
+    assert fetch_again.calls == [] and restarted.stats()["disk_hits"] == 1
+
+    # ~ Expiry times are stored too
+    expired, fetch_expired, clock_expired = make_cache(path=path, ttl_seconds=60)
+    clock_expired.now = clock.now + 61
+    expired.lookup("ada lovelace")
+    assert fetch_expired.calls == ["ada lovelace"]
+
+
+def test_alookup_goes_through_the_same_cache():
+    cache, fetch, _ = make_cache()
+    assert asyncio.run(cache.alookup("python")) == "Page: python"
+    assert asyncio.run(cache.alookup("Python")) == "Page: python"
+    assert cache.lookup("PYTHON") == "Page: python"
+    assert fetch.calls == ["python"]
+
+
+def test_cached_tool_keeps_the_tool_interface():
+    @tool
+    def wikipedia(query: str) -> str:
+        """Look up a topic on Wikipedia."""
+        raise AssertionError("the cache's fetch is called instead")
+
+    cache, fetch, _ = make_cache()
+    wrapped = cached_tool(wikipedia, cache)
+    assert wrapped.name == "wikipedia" and wrapped.description == wikipedia.description
+    assert wrapped.args == wikipedia.args
+    assert wrapped.invoke({"query": "Rust"}) == "Page: Rust"
+    assert asyncio.run(wrapped.ainvoke({"query": "rust"})) == "Page: Rust"
+    assert fetch.calls == ["Rust"]
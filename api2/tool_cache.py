@@ -0,0 +1,151 @@
+"""Caching for lookup tools (Wikipedia) whose answers rarely change between calls."""
+
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from langchain_core.tools import BaseTool, StructuredTool
+
+# ~ What WikipediaAPIWrapper.run returns when the search finds nothing
+WIKIPEDIA_MISS = "No good Wikipedia Search Result was found"
+
+
+def normalize_query(query: str) -> str:
+    """'  Who was  Ada Lovelace? ' and 'who was ada lovelace' share a cache entry."""
+    query = re.sub(r"\s+", " ", query).strip().lower()
+    return query.strip(" ?!.,;:\"'")
+
+
+class LookupCache:
+    """An LRU + TTL cache in front of a `fetch(query) -> str` lookup.
+
+    - Keys are normalized queries.
+    - Misses (`fetch` returned `miss_marker`) are cached too, for the shorter `negative_ttl`.
+    - With `path` set, entries are also written to a small SQLite file, so a restart starts warm.
+    - Exceptions from `fetch` are never cached.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], str],
+        *,
+        max_entries: int = 1024,
+        ttl_seconds: float = 24 * 3600,
+        negative_ttl_seconds: float = 600,
+        miss_marker: str = WIKIPEDIA_MISS,
+        path: Optional[str] = None,
+    ):
+        self.fetch = fetch
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.miss_marker = miss_marker
+        self._lock = threading.Lock()
+        # normalized query -> (expires_at, value), least recently used first
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self.counters = {"hits": 0, "negative_hits": 0, "disk_hits": 0, "misses": 0}
+
+        self.path = path
+        self._conn = None  # opened on first use, so a cache built before a fork isn't shared by the workers
+
+    @property
+    def _db(self):
+        if self.path and self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS lookups (query TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+        return self._conn
+
+    # ~ Wall-clock time, because expiry times are shared with the on-disk store
+    def _now(self) -> float:
+        return time.time()
+
+    def get(self, query: str) -> Optional[str]:
+        key = normalize_query(query)
+        now = self._now()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.counters["negative_hits" if value == self.miss_marker else "hits"] += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM lookups WHERE query = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._store(key, row[0], row[1])
+                    self.counters["disk_hits"] += 1
+                    return row[0]
+        return None
+
+    def set(self, query: str, value: str) -> None:
+        key = normalize_query(query)
+        ttl = self.negative_ttl_seconds if value == self.miss_marker else self.ttl_seconds
+        expires_at = self._now() + ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO lookups VALUES (?, ?, ?)", (key, value, expires_at)
+                )
+
+    def _store(self, key: str, value: str, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def lookup(self, query: str) -> str:
+        if (cached := self.get(query)) is not None:
+            return cached
+        with self._lock:
+            self.counters["misses"] += 1
+        value = self.fetch(query)
+        self.set(query, value)
+        return value
+
+    async def alookup(self, query: str) -> str:
+        if (cached := self.get(query)) is not None:
+            return cached
+        with self._lock:
+            self.counters["misses"] += 1
+        value = await asyncio.to_thread(self.fetch, query)
+        self.set(query, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            entries = len(self._entries)
+        lookups = sum(counters.values())
+        served = counters["hits"] + counters["negative_hits"] + counters["disk_hits"]
+        return {
+            "entries": entries,
+            **counters,
+            "hit_rate": round(served / lookups, 3) if lookups else 0.0,
+        }
+
+
+def cached_tool(tool: BaseTool, cache: LookupCache) -> BaseTool:
+    """Same name, description and arguments as `tool`, but every call goes through `cache`.
+
+    `cache` is anything with `lookup`/`alookup`: a LookupCache, or a prefetch.Prefetcher in front of one.
+    """
+    return StructuredTool.from_function(
+        func=cache.lookup,
+        coroutine=cache.alookup,
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+    )
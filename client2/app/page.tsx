@@ -5,6 +5,7 @@ export default function Home() {
   const [message, setMessage] = useState("");
   const [loading, setLoading] = useState(false);
   const [response, setResponse] = useState("");
+  const [sessionId, setSessionId] = useState<string | null>(null);
 
   const submitRequest = async (e: React.FormEvent<HTMLFormElement>) => {
     e.preventDefault();
@@ -16,7 +17,7 @@ export default function Home() {
 
       const response = await fetch("http://127.0.0.1:8000/chat", {
         method: "POST",
-        body: JSON.stringify({ message }),
+        body: JSON.stringify({ message, session_id: sessionId }),
         headers: {
           "Content-Type": "application/json",
         },
@@ -28,6 +29,9 @@ export default function Home() {
         throw new Error(`Error Status: ${response.status}`);
       }
 
+      // Keep talking on the same thread the server started for us
+      setSessionId(response.headers.get("X-Session-Id"));
+
       if (response.body) {
         // Allows streaming of the response body
         const reader = response.body.getReader();